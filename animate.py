@@ -25,8 +25,8 @@ been modified if obtained elsewhere.
 Dependencies
 ------------
 
-OpenCV and NumPy (video file generation), plus the hpgl2tek module distributed
-alongside this file.
+NumPy and PIL, plus the hpgl2tek module distributed alongside this file. Video
+file generation also requires the ffmpeg program with the libx264 encoder.
 
 Animation file language
 -----------------------
@@ -110,14 +110,17 @@ project at <http://github.com/stepleton/hpgl2tek>.
 """
 
 import argparse
+import collections
+import concurrent.futures
 import configparser
 import contextlib
-import cv2
 import dataclasses
+import functools
 import io
 import math
 import numpy as np
 import os
+import PIL.Image
 import random
 import subprocess
 import sys
@@ -126,11 +129,14 @@ import zipfile
 
 import hpgl2tek
 
-from typing import BinaryIO, Iterator
+from typing import BinaryIO, Iterable, Iterator
 
 
 XTERM = '/usr/bin/xterm'
 CAT = '/bin/cat'
+FFMPEG = '/usr/bin/ffmpeg'
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # Timestamp for ZIP archive members.
 
 
 def _define_flags() -> argparse.ArgumentParser:
@@ -207,48 +213,61 @@ Point = tuple[float, float]
 Points = tuple[Point, ...]
 
 
-def _spline(points: Points, t: float) -> tuple[float, float]:
-  """Calculate parametric location t along a spline."""
-  if len(points) == 1:
-    return points[0]
-  else:
-    lerps: Points = tuple(
-        ((1 - t)*x1 + t*x2, (1 - t)*y1 + t*y2)  # IYKYK
-        for (x1, y1), (x2, y2) in zip(points[:-1], points[1:]))
-    return _spline(lerps, t)
+def _bernstein_basis(n: int, ts: np.ndarray) -> np.ndarray:
+  """Degree-n Bernstein basis polynomials evaluated at parametric locations.
+
+  Args:
+    n: Spline degree (the number of control points less one).
+    ts: Parametric locations in [0, 1], a 1-D array.
+
+  Returns:
+    An (n+1, len(ts)) array B where B[i, j] = C(n, i) * ts[j]**i *
+    (1 - ts[j])**(n - i). Multiplying the transposed (n+1, 2) control point
+    array by B yields the spline's x, y values at all of the ts.
+  """
+  i = np.arange(n + 1)[:, np.newaxis]
+  binomials = np.array([math.comb(n, k) for k in range(n + 1)], np.float64)
+  return binomials[:, np.newaxis] * ts**i * (1 - ts)**(n - i)
+
+
+@functools.lru_cache(maxsize=None)
+def _tick_basis(n: int, segments: int) -> np.ndarray:
+  """Bernstein basis at the "tick" t values used by _spline_to_segment_points.
+
+  All paths of the same degree and segment count share the same ticks, so
+  the basis is computed once and reused; the result is read-only.
+  """
+  basis = _bernstein_basis(n, np.linspace(0.0, 1.0, 3*segments + 1))
+  basis.flags.writeable = False
+  return basis
 
 
 def _spline_to_segment_points(
-    control_points: tuple[tuple[float, float], ...],
+    control_points: np.ndarray,
     segments: int = 100,
 ) -> tuple[tuple[float, float], ...]:
   # First, generate a lookup table that approximates a function mapping t to
-  # distance along the curve.
-  t_to_dist_lut = [0.0]
-  x_old, y_old = control_points[0]
-  for t in ((s + 1)/(3*segments) for s in range(3*segments)):
-    x, y = _spline(control_points, t)
-    t_to_dist_lut.append(
-        t_to_dist_lut[-1] + math.sqrt((x - x_old)**2 + (y - y_old)**2))
-    x_old, y_old = x, y
+  # distance along the curve. The spline is evaluated at all of the "tick" t
+  # values in one go.
+  ticks = np.linspace(0.0, 1.0, 3*segments + 1)
+  tick_xys = control_points.T @ _tick_basis(len(control_points) - 1, segments)
+  tick_xs, tick_ys = tick_xys
+  t_to_dist_lut = np.zeros(len(ticks))
+  dists = t_to_dist_lut[1:]  # A view; we fill it in place.
+  np.hypot(np.diff(tick_xs), np.diff(tick_ys), out=dists)
+  np.cumsum(dists, out=dists)
 
   # Normalise the lookup table so that the distance is 1.0.
-  t_to_dist_lut = [d / t_to_dist_lut[-1] for d in t_to_dist_lut]
+  t_to_dist_lut /= t_to_dist_lut[-1]
 
-  # Compute segment points for equally-spaced distances along the spline.
-  segment_points = [control_points[0]]
-  lut_index = 0
-  for d in ((s + 1)/segments for s in range(segments)):
-    # Find the t value for distance d.
-    while t_to_dist_lut[lut_index + 1] < d:
-      lut_index += 1
-    lo, hi = t_to_dist_lut[lut_index:(lut_index + 2)]
-    t = (lut_index + (d - lo)/(hi - lo or math.inf))/(3*segments)
-    # Append the spline value for this interpolated t.
-    segment_points.append(_spline(control_points, t))
+  # Find t values for equally-spaced distances along the spline by
+  # interpolating within the lookup table, then compute segment points there.
+  ds = np.arange(segments + 1) / segments
+  ts = np.interp(ds, t_to_dist_lut, ticks)
+  segment_xys = control_points.T @ _bernstein_basis(len(control_points) - 1, ts)
 
-  # Convert the list to a tuple and return.
-  return tuple(segment_points)
+  # Convert the array to a tuple of x, y tuples and return.
+  return tuple(zip(segment_xys[0].tolist(), segment_xys[1].tolist()))
 
 
 class Path:
@@ -264,26 +283,16 @@ class Path:
       control_points: Spline control points --- x,y tuples.
       segments: Number of equal-length linear segments to approximate by.
     """
-    self.segment_points = _spline_to_segment_points(control_points, segments)
-
-  def at(self, d: float) -> tuple[float, float]:
-    """Interpolated position at fraction d along the spline's length.
-
-    Args:
-      d: Value in [0, 1].
-
-    Returns:
-      x, y coordinate of the point at d's fraction of the spline's length.
-    """
-    # Find which two segment points d lies between, and where in between.
-    segments = len(self.segment_points) - 1
-    sp_index = min(int(d*segments), segments - 1)
-    lo, hi = sp_index/segments, (sp_index + 1)/segments
-    d_frac = (d - lo)/(hi - lo or math.inf)
+    points = np.asarray(control_points, dtype=np.float64)
+    self.segment_points = _spline_to_segment_points(points, segments)
 
-    # Interpolate between the two segment points.
-    (x_lo, y_lo), (x_hi, y_hi) = self.segment_points[sp_index:sp_index+2]
-    return (1 - d_frac)*x_lo + d_frac*x_hi, (1 - d_frac)*y_lo + d_frac*y_hi
+    # Positions along the path are looked up for every frame (see
+    # _DrawingArrays.locations_at), so precompute a lookup table holding each
+    # segment's starting point and its x, y extent.
+    self._segment_lut = tuple(
+        (x_lo, y_lo, x_hi - x_lo, y_hi - y_lo)
+        for (x_lo, y_lo), (x_hi, y_hi) in zip(self.segment_points[:-1],
+                                              self.segment_points[1:]))
 
 
 @dataclasses.dataclass
@@ -296,8 +305,8 @@ class Rose:
   θ := nu * (t_abs + t_offset)
   dx := r * cos(θ) * stretch_x
   dy := r * sin(θ) * stretch_y
-  dx := dx * cos(rotate) - dy * sin(rotate)
-  dy := dx * sin(rotate) + dy * cos(rotate)
+  dx, dy := (dx * cos(rotate) - dy * sin(rotate),
+             dx * sin(rotate) + dy * cos(rotate))
   """
   k: float = 1.0          # Rose curve k parameter
   nu: float = 1.0         # Rotational speed parameter
@@ -306,24 +315,12 @@ class Rose:
   rotate: float = 0.0     # Rotate the curve this many radians after scaling
   t_offset: float = 0.0   # Offset the t_abs input by this amount
 
-  def at(self, t_abs: float) -> tuple[float, float]:
-    """Perturbation at absolute time t_abs.
-
-    Args:
-      t_abs: Absolute animation time.
-
-    Returns:
-      dx, dy perturbation of the point at absolute time t_abs.
-    """
-    r = math.cos(self.k * (t_abs + self.t_offset))
-    theta = self.nu * (t_abs + self.t_offset)
-    dx = r * math.cos(theta) * self.stretch_x
-    dy = r * math.sin(theta) * self.stretch_y
-    sin = math.sin(self.rotate)
-    cos = math.cos(self.rotate)
-    dx, dy = (dx * cos - dy * sin), (dx * sin + dy * cos)
+  _sin_rotate: float = dataclasses.field(init=False, repr=False)
+  _cos_rotate: float = dataclasses.field(init=False, repr=False)
 
-    return dx, dy
+  def __post_init__(self):
+    self._sin_rotate = math.sin(self.rotate)
+    self._cos_rotate = math.cos(self.rotate)
 
 
 @dataclasses.dataclass
@@ -333,10 +330,6 @@ class Blink:
   off: float = 0.0       # Go invisible for this long, then repeat
   t_offset: float = 0.0  # Offset the t_abs input by this amount
 
-  def at(self, t_abs: float) -> bool:
-    """Whether the object is visible at absolute time t_abs."""
-    return (t_abs + self.t_offset) % (self.on + self.off) < self.on
-
 
 @dataclasses.dataclass
 class Drawing:
@@ -356,42 +349,6 @@ class Drawing:
   _orig_x: float | None = None
   _orig_y: float | None = None
 
-  def transform_at(self, t_abs: float, t_rel: float) -> str:
-    """Retrieve a -t flag directive for this drawing at a specific time
-
-    Args:
-      t_abs: Absolute time in seconds since the start of the animation.
-      t_rel: Progress through the animation --- a value in [0, 1].
-
-    Returns:
-      A hpgl2tek.py -t flag directive as described.
-    """
-    if not self.start <= t_rel <= self.end: raise ValueError(
-        f'Lifespan for {self.filename} is {self.start}..{self.end}, but '
-        f'there was an attempt to draw it at relative position {t_rel}')
-    transform_parts = [self.transform] if self.transform else []
-
-    # sorry, this is some post-hoc caching nonsense! but this is a
-    # speed-critical section.
-    if self._orig_x is None:
-      self._set_origs()
-
-    # Apply programmed motions if specified.
-    x, y = self._orig_x, self._orig_y
-    assert x is not None  # mypy
-    assert y is not None
-    if self.path is not None:
-      x, y = self.path.at(
-          (t_rel - self.start)/(self.end - self.start or math.inf))
-    if self.rose is not None:
-      dx, dy = self.rose.at(t_abs)
-      x += dx
-      y += dy
-    if x != self._orig_x or y != self._orig_y:
-      transform_parts.append(f'x{x}!y{y}')
-
-    return '!'.join(transform_parts)
-
   def _set_origs(self):
     """Analyse the transform spec; determine x, y drawing location."""
     self._orig_x = self._orig_y = 0.0
@@ -402,6 +359,191 @@ class Drawing:
         self._orig_y = float(part[1:])
 
 
+@dataclasses.dataclass
+class _DrawingArrays:
+  """Drawing parameters packed into arrays, one entry per drawing.
+
+  Lets Animation.at work out the visibility and location of all drawings in a
+  frame with a handful of NumPy operations instead of per-drawing Python calls.
+  This is the only place where Path, Rose, and Blink motions are evaluated.
+  """
+  drawings: list[Drawing]
+  transform_prefixes: list[str]  # Drawing.transform, plus ! if nonempty
+  starts: np.ndarray          # Drawing.start values
+  ends: np.ndarray            # Drawing.end values
+  start_order: np.ndarray     # Drawing indices sorted by start value
+  sorted_starts: np.ndarray   # starts[start_order]
+  spans: np.ndarray           # end - start, or inf where that's 0
+  orig_xs: np.ndarray         # x displacements from Drawing.transform
+  orig_ys: np.ndarray         # y displacements from Drawing.transform
+  blink_ons: np.ndarray       # Blink parameters; always-on for no blink
+  blink_periods: np.ndarray
+  blink_t_offsets: np.ndarray
+  rose_ks: np.ndarray         # Rose parameters; zero stretch for no rose
+  rose_nus: np.ndarray
+  rose_stretch_xs: np.ndarray
+  rose_stretch_ys: np.ndarray
+  rose_sins: np.ndarray       # sin and cos of Rose.rotate
+  rose_coss: np.ndarray
+  rose_t_offsets: np.ndarray
+  path_rows: np.ndarray       # Indices of drawings that have paths
+  path_segments: np.ndarray   # Number of segments in each of those paths
+  path_luts: np.ndarray       # Path._segment_lut tables, zero-padded
+
+  @classmethod
+  def from_drawings(cls, drawings: Iterable[Drawing]) -> '_DrawingArrays':
+    """Pack parameters for the drawings into a new _DrawingArrays."""
+    drawings = list(drawings)
+    for drawing in drawings:
+      if drawing._orig_x is None:
+        drawing._set_origs()
+
+    def array(values: Iterable[float | None]) -> np.ndarray:
+      return np.array(list(values), dtype=np.float64)
+
+    blinks = [d.blink or Blink() for d in drawings]
+    roses = [d.rose or Rose(stretch_x=0.0, stretch_y=0.0) for d in drawings]
+    paths = [(i, d.path) for i, d in enumerate(drawings) if d.path is not None]
+
+    # Stack path lookup tables, padding shorter tables with zeros.
+    max_segments = max((len(p._segment_lut) for _, p in paths), default=1)
+    path_luts = np.zeros((len(paths), max_segments, 4))
+    for row, (_, path) in enumerate(paths):
+      path_luts[row, :len(path._segment_lut)] = path._segment_lut
+
+    starts = array(d.start for d in drawings)
+    start_order = np.argsort(starts, kind='stable')
+
+    return cls(
+        drawings=drawings,
+        transform_prefixes=[f'{d.transform}!' if d.transform else ''
+                            for d in drawings],
+        starts=starts,
+        ends=array(d.end for d in drawings),
+        start_order=start_order,
+        sorted_starts=starts[start_order],
+        spans=array((d.end - d.start) or math.inf for d in drawings),
+        orig_xs=array(d._orig_x for d in drawings),
+        orig_ys=array(d._orig_y for d in drawings),
+        blink_ons=array(b.on for b in blinks),
+        blink_periods=array(b.on + b.off for b in blinks),
+        blink_t_offsets=array(b.t_offset for b in blinks),
+        rose_ks=array(r.k for r in roses),
+        rose_nus=array(r.nu for r in roses),
+        rose_stretch_xs=array(r.stretch_x for r in roses),
+        rose_stretch_ys=array(r.stretch_y for r in roses),
+        rose_sins=array(r._sin_rotate for r in roses),
+        rose_coss=array(r._cos_rotate for r in roses),
+        rose_t_offsets=array(r.t_offset for r in roses),
+        path_rows=np.array([i for i, _ in paths], dtype=np.intp),
+        path_segments=np.array(
+            [len(p._segment_lut) for _, p in paths], dtype=np.intp),
+        path_luts=path_luts)
+
+  def visible_at(self, t_abs: float, t_rel: float) -> np.ndarray:
+    """Indices of drawings visible at a specific time.
+
+    Args:
+      t_abs: Absolute time in seconds since the start of the animation.
+      t_rel: Progress through the animation --- a value in [0, 1].
+
+    Returns:
+      Indices of the drawings that should be drawn, in ascending order.
+    """
+    # Only drawings that have started are candidates. Binary search finds them
+    # in the start-sorted order; sorting them again restores drawing order.
+    started = np.sort(self.start_order[
+        :np.searchsorted(self.sorted_starts, t_rel, side='right')])
+    candidates = started[t_rel <= self.ends[started]]
+    blinked_on = ((t_abs + self.blink_t_offsets[candidates]) %
+                  self.blink_periods[candidates] < self.blink_ons[candidates])
+    return candidates[blinked_on]
+
+  def locations_at(
+      self, t_abs: float, t_rel: float) -> tuple[np.ndarray, np.ndarray]:
+    """x, y locations of all drawings at a specific time.
+
+    Args:
+      t_abs: Absolute time in seconds since the start of the animation.
+      t_rel: Progress through the animation --- a value in [0, 1].
+
+    Returns:
+      Arrays of x and y locations for every drawing. Values for drawings that
+      aren't visible at this time are meaningless.
+    """
+    xs, ys = self.orig_xs.copy(), self.orig_ys.copy()
+
+    # Apply programmed motions along paths, interpolating within the segment of
+    # each path's lookup table that the drawing's progress d falls in.
+    if len(self.path_rows):
+      rows = self.path_rows
+      segments = self.path_segments
+      d = (t_rel - self.starts[rows])/self.spans[rows]
+      sp_indices = np.clip((d*segments).astype(np.intp), 0, segments - 1)
+      d_fracs = d*segments - sp_indices
+      lut = self.path_luts[np.arange(len(rows)), sp_indices]
+      xs[rows] = lut[:, 0] + d_fracs*lut[:, 2]
+      ys[rows] = lut[:, 1] + d_fracs*lut[:, 3]
+
+    # Apply rose perturbations, calculated as in the Rose docstring.
+    t = t_abs + self.rose_t_offsets
+    r = np.cos(self.rose_ks * t)
+    theta = self.rose_nus * t
+    dx = r * np.cos(theta) * self.rose_stretch_xs
+    dy = r * np.sin(theta) * self.rose_stretch_ys
+    xs += dx * self.rose_coss - dy * self.rose_sins
+    ys += dx * self.rose_sins + dy * self.rose_coss
+
+    return xs, ys
+
+
+@functools.lru_cache(maxsize=None)
+def _read_hpgl_ops_cached(filename: str) -> list[hpgl2tek.HpglOps]:
+  """Read and parse an HPGL file, remembering the result for later calls."""
+  with open(filename, 'r') as f:
+    return hpgl2tek.hpgl_lines_to_ops(f.read().splitlines())
+
+
+@functools.lru_cache(maxsize=512)
+def _get_transformed_strokes_cached(
+    filename: str,
+    ts_kwargs: tuple[tuple[str, bool | float], ...],
+) -> hpgl2tek.Strokes:
+  """A memoised hpgl2tek.transform_strokes for the HPGL file named filename.
+
+  Args:
+    filename: HPGL file to draw.
+    ts_kwargs: Sorted items from a hpgl2tek.transform_strokes kwargs dict.
+
+  Returns:
+    The file's transformed strokes, which callers must not modify.
+  """
+  strokes = hpgl2tek.hpgl_ops_to_strokes(_read_hpgl_ops_cached(filename))
+  return hpgl2tek.transform_strokes(strokes, **dict(ts_kwargs))  # type: ignore
+
+
+@functools.lru_cache(maxsize=256)
+def _get_strokes_cached(
+    filenames: tuple[str, ...],
+    transforms: str,
+    lines: str,
+) -> hpgl2tek.Strokes:
+  """A memoised hpgl2tek.get_all_strokes for HPGL files named by filenames.
+
+  Animations often draw identical frames (or identical frame parts) many times
+  over, so it pays to remember results, both for whole frames and for each
+  drawing within them. Callers share the returned strokes, so they must not
+  modify them.
+  """
+  all_strokes: hpgl2tek.Strokes = []
+  ts_kwargses = hpgl2tek.parse_transforms(transforms, len(filenames))
+  for filename, ts_kwargs in zip(filenames, ts_kwargses):
+    all_strokes.extend(_get_transformed_strokes_cached(
+        filename, tuple(sorted(ts_kwargs.items()))))
+  all_strokes.extend(hpgl2tek.parse_extra_lines(lines))
+  return all_strokes
+
+
 class OriginShiftError(RuntimeError):
   """For signalling that origin shifting pushed drawn points off the screen."""
 
@@ -414,6 +556,17 @@ class Animation:
   duration: float = 5.0
   r12_origin_shift: tuple[int, int] = (0, 0)
 
+  _arrays: _DrawingArrays | None = dataclasses.field(
+      default=None, init=False, repr=False, compare=False)
+  _last_frame: tuple[tuple[bytes, ...], hpgl2tek.Strokes] | None = (
+      dataclasses.field(default=None, init=False, repr=False, compare=False))
+
+  def __getstate__(self) -> dict:
+    """Pickle without cached values, e.g. when sending to worker processes."""
+    state = self.__dict__.copy()
+    state['_arrays'] = state['_last_frame'] = None
+    return state
+
   def process_config(self, config: configparser.ConfigParser):
     """Fill in Animation properties from a parsed config file."""
     # First, copy in basic values.
@@ -477,6 +630,10 @@ class Animation:
 
       self.drawings[key] = Drawing(**drawing_kwargs)
 
+    # Any packed drawing parameters and remembered frames are now out of date.
+    self._arrays = None
+    self._last_frame = None
+
   def at(self, t_abs: float) -> hpgl2tek.Strokes:
     """Construct hpgl2tek.py strokes for time absolute time t."""
     # Compute normalised time in [0, 1], covering the animation's duration.
@@ -484,25 +641,36 @@ class Animation:
         f'Value {t_abs=} not in [0, {self.duration}]')
     t_rel = t_abs / self.duration
 
-    # Collect drawings that are visible right now.
-    t_drawings = []
-    for drawing in self.drawings.values():
-      if drawing.blink is None or drawing.blink.at(t_abs):
-        if drawing.start <= t_rel <= drawing.end:
-          t_drawings.append(drawing)
+    # Work out which drawings are visible right now, and where they are.
+    if self._arrays is None:
+      self._arrays = _DrawingArrays.from_drawings(self.drawings.values())
+    arrays = self._arrays
+    visible = arrays.visible_at(t_abs, t_rel)
+    xs, ys = arrays.locations_at(t_abs, t_rel)
+    moved = (xs != arrays.orig_xs) | (ys != arrays.orig_ys)
+
+    # If the same drawings are in the same places as they were in the last
+    # frame, then the last frame's strokes can be used again.
+    frame_key = (visible.tobytes(), xs[visible].tobytes(),
+                 ys[visible].tobytes())
+    if self._last_frame is not None and self._last_frame[0] == frame_key:
+      return self._last_frame[1]
 
     # Collect drawing filenames and drawing transformations.
+    t_indices = visible.tolist()
+    t_drawings = [arrays.drawings[i] for i in t_indices]
     t_filenames = [d.filename for d in t_drawings]
-    t_transforms = [d.transform_at(t_abs, t_rel) for d in t_drawings]
-    t_transforms = [f'{i}:{x}' for i, x in enumerate(t_transforms)]
-    t_lines = [d.lines for d in t_drawings if d.lines]
-
-    # Open HPGL files; assemble strokes and drawing commands.
-    with contextlib.ExitStack() as stack:
-      files = [stack.enter_context(open(fn, 'r')) for fn in t_filenames]
-      transforms = ','.join(t_transforms)
-      lines = ','.join(t_lines)
-      strokes = hpgl2tek.get_all_strokes(files, transforms, lines)
+    t_transforms = ','.join([
+        f'{i}:{arrays.transform_prefixes[j]}x{x}!y{y}' if d_moved else
+        f'{i}:{arrays.drawings[j].transform}'
+        for i, (j, x, y, d_moved) in enumerate(zip(
+            t_indices, xs[visible].tolist(), ys[visible].tolist(),
+            moved[visible].tolist()))])
+    t_lines = ','.join([d.lines for d in t_drawings if d.lines])
+
+    # Assemble strokes and drawing commands.
+    strokes = _get_strokes_cached(tuple(t_filenames), t_transforms, t_lines)
+    self._last_frame = frame_key, strokes
     return strokes
 
   def animate_to_r12zip(
@@ -544,7 +712,6 @@ class Animation:
     """
     n = file_number  # Abbreviation.
     num_frames = int(self.duration * self.fps)
-    seconds_per_frame = 1 / self.fps
 
     # Prepare the BASIC program to draw the animation.
     automated = automate_delay > 0.0
@@ -573,26 +740,58 @@ class Animation:
     fn_basic = f'{n:<7}ASCII   PROG Animation player {len(basic)}'
 
     # We'll start packing data into a zip file. We won't bother compressing.
+    # All archive members share one fixed timestamp, which saves looking up
+    # the time for each member (and makes archives reproducible).
     zipdata = io.BytesIO()
-    with zipfile.ZipFile(zipdata, "a") as zf:
-      zf.writestr(fn_basic, basic)
-
-      # Now to make the indivdual animation frames.
-      for frame in range(num_frames):
-        t_abs = frame * seconds_per_frame
-        strokes = self._apply_r12_origin_shift(self.at(t_abs))
-        r12_commands = hpgl2tek.strokes_to_tek4050r12(strokes)
-        r12_image = hpgl2tek.tek4050r12_to_tape_records(r12_commands)
-        k = n + frame + 1
-        fn_frame = f'{k:<7}BINARY  DATA Frame {frame:<5}      {len(r12_image)}'
-        zf.writestr(fn_frame, r12_image)
-
-        # Show the frame on the monitor if one is available.
-        self._show_on_monitor(strokes, monitor_pipe)
+    with zipfile.ZipFile(zipdata, "w", zipfile.ZIP_STORED) as zf:
+      zf.writestr(zipfile.ZipInfo(fn_basic, ZIP_DATE_TIME), basic)
+
+      # Now to make the indivdual animation frames. Frames are independent of
+      # each other, so worker processes render them in parallel; results
+      # arrive here in frame order. Each worker receives the animation just
+      # once, when it starts, and not again with every batch of frames.
+      render = functools.partial(_render_r12_frame_in_worker, n)
+      with concurrent.futures.ProcessPoolExecutor(
+          initializer=_init_r12_worker, initargs=(self,)) as executor:
+        try:
+          for fn_frame, r12_image, strokes in executor.map(
+              render, range(num_frames), chunksize=8):
+            zf.writestr(zipfile.ZipInfo(fn_frame, ZIP_DATE_TIME), r12_image)
+
+            # Show the frame on the monitor if one is available.
+            self._show_on_monitor(strokes, monitor_pipe)
+        except:
+          executor.shutdown(cancel_futures=True)  # Don't finish a doomed job.
+          raise
 
     # Return the final zip file data.
     return zipdata.getvalue()
 
+  def _render_r12_frame(
+      self,
+      file_number: int,
+      frame: int,
+  ) -> tuple[str, bytes, hpgl2tek.Strokes]:
+    """Render one frame for animate_to_r12zip.
+
+    Args:
+      file_number: As in animate_to_r12zip.
+      frame: Index of the frame to render.
+
+    Returns: a tuple with three elements
+      [0]: Tape filename for the frame.
+      [1]: Tape record data for the frame.
+      [2]: Strokes drawn in the frame (after any origin shift).
+    """
+    seconds_per_frame = 1 / self.fps
+    t_abs = frame * seconds_per_frame
+    strokes = self._apply_r12_origin_shift(self.at(t_abs))
+    r12_commands = hpgl2tek.strokes_to_tek4050r12(strokes)
+    r12_image = hpgl2tek.tek4050r12_to_tape_records(r12_commands)
+    k = file_number + frame + 1
+    fn_frame = f'{k:<7}BINARY  DATA Frame {frame:<5}      {len(r12_image)}'
+    return fn_frame, r12_image, strokes
+
   def animate_to_video(self, monitor_pipe: BinaryIO | None) -> bytes:
     """Construct an MP4 video of the animation in stylish green-on-black.
 
@@ -608,31 +807,94 @@ class Animation:
       MP4 video data suitable for writing to a file.
     """
     num_frames = int(self.duration * self.fps)
-    seconds_per_frame = 1 / self.fps
 
-    # Prepare OpenCV's video writer and a temporary directory where the created
-    # video file will live.
+    # Start an ffmpeg process that encodes raw frames piped into it. Frames are
+    # single-channel, and ffmpeg draws them in green.
+    # It writes the video into a temporary directory, since MP4 files need a
+    # seekable output.
     with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tempdir:
-      fourcc = cv2.VideoWriter_fourcc(*'mp4v')
       tempfilename = os.path.join(tempdir, 'video.mp4')
-      videowriter = cv2.VideoWriter(
-          tempfilename, fourcc, self.fps, (1024, 780))
+      encoder = subprocess.Popen([
+          FFMPEG, '-loglevel', 'error', '-y',
+          '-f', 'rawvideo', '-pix_fmt', 'gray', '-s', '1024x780',
+          '-r', str(self.fps), '-i', '-',
+          '-vf', 'format=rgb24,colorchannelmixer=rr=0:bb=0',
+          '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+          tempfilename], stdin=subprocess.PIPE)
+      assert encoder.stdin is not None  # mypy
+
+      # All frames are drawn into the same canvas, which strokes_to_pil_image
+      # clears between frames. The canvas holds just the frame's G channel.
+      canvas = PIL.Image.new('L', size=(1024, 780))
 
       # Render individual animation frames and add to the video.
-      for frame in range(num_frames):
-        t_abs = frame * seconds_per_frame
-        strokes = self.at(t_abs)
-        pil_image = hpgl2tek.strokes_to_pil_image(strokes)
-        videowriter.write(np.array(pil_image))
+      for strokes in self._render_frames(num_frames):
+        hpgl2tek.strokes_to_pil_image(strokes, canvas)
+        encoder.stdin.write(canvas.tobytes())
 
         # Show the frame on the monitor if one is available.
         self._show_on_monitor(strokes, monitor_pipe)
 
-      # Close video writer and load video data, then return the data.
-      videowriter.release()
+      # Let the encoder finish, then load video data and return the data.
+      encoder.stdin.close()
+      if (returncode := encoder.wait()) != 0: raise RuntimeError(
+          f'{FFMPEG} failed to encode the video (exit status {returncode})')
       with open(tempfilename, 'rb') as f:
         return f.read()
 
+  def compute_shift_bounds(self) -> tuple[tuple[int, int], tuple[int, int]]:
+    """Find the R12 origin shifts that keep the whole animation on the screen.
+
+    Renders every frame of the animation (without any origin shift) to find
+    the extremes of all of the points that get drawn.
+
+    Returns: a tuple with two elements
+      [0]: (Inclusive) smallest and largest usable x origin shifts.
+      [1]: (Inclusive) smallest and largest usable y origin shifts.
+      If no shift is usable in a dimension, its smallest shift will be larger
+      than its largest.
+    """
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for strokes in self._render_frames(int(self.duration * self.fps)):
+      if points := [xy for stroke in strokes for xy in stroke]:
+        points_array = np.array(points)
+        x_lo, y_lo = points_array.min(axis=0).tolist()
+        x_hi, y_hi = points_array.max(axis=0).tolist()
+        min_x, min_y = min(min_x, x_lo), min(min_y, y_lo)
+        max_x, max_y = max(max_x, x_hi), max(max_y, y_hi)
+
+    if min_x > max_x:  # Nothing is ever drawn, so anything goes.
+      return (-1023, 1023), (-780, 780)
+
+    # Shifted points must satisfy 0 < x < 1023 and 0 < y < 780; see
+    # _apply_r12_origin_shift.
+    return ((math.floor(-min_x) + 1, math.ceil(1023 - max_x) - 1),
+            (math.floor(-min_y) + 1, math.ceil(780 - max_y) - 1))
+
+  def _render_frames(self, num_frames: int) -> Iterator[hpgl2tek.Strokes]:
+    """Yield strokes for successive animation frames.
+
+    A worker thread assembles strokes for the next frame while the caller is
+    still converting and writing out the current one.
+
+    Args:
+      num_frames: Number of frames to render, starting from time 0.
+
+    Yields:
+      Strokes for each frame in turn, as returned by at().
+    """
+    seconds_per_frame = 1 / self.fps
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+      pending: collections.deque[concurrent.futures.Future] = (
+          collections.deque())
+      for frame in range(num_frames):
+        pending.append(executor.submit(self.at, frame * seconds_per_frame))
+        if len(pending) == 2:
+          yield pending.popleft().result()
+      while pending:
+        yield pending.popleft().result()
+
   def _apply_r12_origin_shift(
       self,
       strokes: hpgl2tek.Strokes,
@@ -640,18 +902,25 @@ class Animation:
     if self.r12_origin_shift == (0, 0):
       return strokes
     else:
-      dx, dy = self.r12_origin_shift
+      # Shift and bounds-check all points from all strokes at once. The array
+      # takes the points' own type, so integer points stay integers.
+      points = np.array(
+          [xy for stroke in strokes for xy in stroke]).reshape(-1, 2)
+      shifted = points + self.r12_origin_shift
+      out_of_bounds = ((shifted <= 0) | (shifted >= (1023, 780))).any(axis=1)
+      if out_of_bounds.any():
+        x, y = points[out_of_bounds.argmax()].tolist()
+        raise OriginShiftError(
+            f'Origin shift displacement of {self.r12_origin_shift} has '
+            f'pushed a point at {(x, y)} out-of-bounds.')
+
+      # Divide the shifted points back up into strokes.
+      shifted_points: hpgl2tek.Stroke = list(map(tuple, shifted.tolist()))
       new_strokes: hpgl2tek.Strokes = []
+      start = 0
       for stroke in strokes:
-        new_stroke: hpgl2tek.Stroke = []
-        for x, y in stroke:
-          if not (0 < (nx := x + dx) < 1023 and 0 < (ny := y + dy) < 780):
-            raise OriginShiftError(
-                f'Origin shift displacement of {self.r12_origin_shift} has '
-                f'pushed a point at {(x, y)} out-of-bounds.')
-          else:
-            new_stroke.append((nx, ny))
-        new_strokes.append(new_stroke)
+        new_strokes.append(shifted_points[start:(start + len(stroke))])
+        start += len(stroke)
       return new_strokes
 
   def _show_on_monitor(
@@ -666,6 +935,25 @@ class Animation:
       monitor_pipe.flush()
 
 
+# The animation rendered by an Animation.animate_to_r12zip worker process.
+_worker_animation: Animation | None = None
+
+
+def _init_r12_worker(animation: Animation):
+  """Initialise an Animation.animate_to_r12zip worker process."""
+  global _worker_animation
+  _worker_animation = animation
+
+
+def _render_r12_frame_in_worker(
+    file_number: int,
+    frame: int,
+) -> tuple[str, bytes, hpgl2tek.Strokes]:
+  """Call _render_r12_frame on a worker process's animation."""
+  assert _worker_animation is not None  # mypy
+  return _worker_animation._render_r12_frame(file_number, frame)
+
+
 @contextlib.contextmanager
 def monitor() -> Iterator[BinaryIO]:
   """Spawn a "monitor" window as a context manager.
@@ -740,42 +1028,38 @@ def main(FLAGS: argparse.Namespace):
   # Read in the config.
   config = configparser.ConfigParser()
   config.read_file(FLAGS.animation_file)
-
-  # Keep trying to animate with various origin shifts until one actually works.
-  # Horrid, I know, but the hack only has to work once.
-  # TODO: Replace with code that calculates viable origin shifting range and
-  # selects a random point within. Too busy to do that right now.
-  while True:
-    try:
-      animation = Animation(r12_origin_shift=(
-          tuple(random.choices(range(-4, 4), k=2)  # type: ignore
-          if FLAGS.origin_shift else (0, 0))))
-      animation.process_config(config)
-
-      # Render the animation as directed, optionally monitoring it in an xterm.
-      with optional_monitor(FLAGS.monitor) as pipe:
-        # For 4050 ZIP file outputs:
-        if FLAGS.device == 'tek4050r12zip':
-          if FLAGS.file_number is None: raise RuntimeError(
-              'A --file_number argument is required for --device=tek4050r12zip')
-          data = animation.animate_to_r12zip(
-              FLAGS.file_number, FLAGS.automate, pipe)
-        # For modern video outputs:
-        elif FLAGS.device == 'video':
-          data = animation.animate_to_video(pipe)
-        else:
-          raise RuntimeError(f'Unknown --device selection "{FLAGS.device}"')
-
-      # If we got here, the animation has successfully completed.
-      break
-
-    except OriginShiftError as e:
-      # If we got here, an origin shift failure has occurred. Print it out and
-      # try a different origin shift (yuck).
-      print(f'{e}')
+  animation = Animation()
+  animation.process_config(config)
+
+  # Choose a random origin shift from the shifts that keep the animation on
+  # the screen. No shift at all, (0, 0), is always an option, since unshifted
+  # points aren't bounds-checked; if nothing else works, it's the only one.
+  # Only R12 outputs use origin shifts.
+  if FLAGS.origin_shift and FLAGS.device == 'tek4050r12zip':
+    (min_dx, max_dx), (min_dy, max_dy) = animation.compute_shift_bounds()
+    while True:  # Draw shifts the same way as always until one works.
+      dx, dy = random.choices(range(-4, 4), k=2)
+      if ((dx, dy) == (0, 0) or
+          (min_dx <= dx <= max_dx and min_dy <= dy <= max_dy)): break
+    animation.r12_origin_shift = (dx, dy)
+
+  # Render the animation as directed, optionally monitoring it in an xterm.
+  with optional_monitor(FLAGS.monitor) as pipe:
+    # For 4050 ZIP file outputs:
+    if FLAGS.device == 'tek4050r12zip':
+      if FLAGS.file_number is None: raise RuntimeError(
+          'A --file_number argument is required for --device=tek4050r12zip')
+      data = animation.animate_to_r12zip(
+          FLAGS.file_number, FLAGS.automate, pipe)
+    # For modern video outputs:
+    elif FLAGS.device == 'video':
+      data = animation.animate_to_video(pipe)
+    else:
+      raise RuntimeError(f'Unknown --device selection "{FLAGS.device}"')
 
   # Save the animation output
   FLAGS.output.buffer.write(data)
+  FLAGS.output.flush()  # Don't count on this happening at interpreter exit.
 
 
 if __name__ == '__main__':
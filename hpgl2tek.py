@@ -28,7 +28,8 @@ following references:
 Dependencies
 ------------
 
-The PIL imaging library is used to render the HPGL compositions to PNG files.
+NumPy is used to transform drawings. The PIL imaging library is used to render
+the HPGL compositions to PNG files.
 
 Revision history
 ----------------
@@ -41,11 +42,14 @@ project at <http://github.com/stepleton/hpgl2tek>.
 """
 
 import argparse
+import dataclasses
+import functools
 import io
-import itertools
 import math
+import numpy as np
 import PIL.Image
 import PIL.ImageDraw
+import re
 import sys
 import textwrap
 import zipfile
@@ -57,6 +61,45 @@ from typing import Callable, Iterable, Sequence, TextIO
 Point = tuple[float, float]
 Stroke = list[Point]
 Strokes = list[Stroke]
+# An affine transformation (a, b, c, d, e, f) maps x,y to
+# (a*x + b*y + c, d*x + e*y + f).
+Affine = tuple[float, float, float, float, float, float]
+# A parsed HPGL command: an opcode (HPGL_PU, HPGL_PD, etc.) and its arguments,
+# and a list of these commands.
+HpglOp = tuple[int, tuple[float, ...]]
+HpglOps = list[HpglOp]
+# Keyword arguments for transform_strokes.
+TransformKwargs = dict[str, bool | float]
+
+
+@dataclasses.dataclass
+class StrokesArray:
+  """Strokes packed into arrays.
+
+  Attributes:
+    points: An (N, 2) array of the x,y coordinates of all points in all of the
+        strokes, one stroke after another.
+    offsets: An (M+1,) integer array of where each of the M strokes begins in
+        points, followed by N. Stroke i is points[offsets[i]:offsets[i+1]].
+  """
+  points: np.ndarray
+  offsets: np.ndarray
+
+  @classmethod
+  def from_strokes(cls, strokes: 'Strokes | StrokesArray') -> 'StrokesArray':
+    """Pack strokes into a new StrokesArray (or pass a StrokesArray through)."""
+    if isinstance(strokes, StrokesArray): return strokes
+    points = np.array([xy for stroke in strokes for xy in stroke],
+                      dtype=np.float64).reshape(-1, 2)
+    offsets = np.zeros(len(strokes) + 1, dtype=np.int64)
+    np.cumsum([len(stroke) for stroke in strokes], out=offsets[1:])
+    return cls(points, offsets)
+
+  def to_strokes(self) -> Strokes:
+    """Unpack the StrokesArray into ordinary strokes."""
+    points: Stroke = list(map(tuple, self.points.tolist()))
+    bounds = self.offsets.tolist()
+    return [points[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
 
 
 def _define_flags() -> argparse.ArgumentParser:
@@ -120,6 +163,12 @@ def _define_flags() -> argparse.ArgumentParser:
   return flags
 
 
+# Opcodes for the HPGL commands that this program handles.
+HPGL_PU, HPGL_PD, HPGL_PA, HPGL_PR, HPGL_AA = range(5)
+_HPGL_OPCODES = {
+    'PU': HPGL_PU, 'PD': HPGL_PD, 'PA': HPGL_PA, 'PR': HPGL_PR, 'AA': HPGL_AA}
+
+
 def hpgl_lines_to_strokes(lines: Iterable[str]) -> Strokes:
   """Convert lines of HPGL data to sequences of x,y coordinates ("strokes").
 
@@ -132,16 +181,7 @@ def hpgl_lines_to_strokes(lines: Iterable[str]) -> Strokes:
     A list of "strokes". A stroke is a sequnece of x,y coordinates that
     must all be connected by straight lines.
   """
-  strokes: Strokes = list()
-  curr_pos = (0., 0.)
-  down_not_up = False
-
-  for line in lines:
-    new_strokes, curr_pos, down_not_up = hpgl_line_to_strokes(
-        line.strip(), curr_pos, down_not_up)
-    strokes.extend(new_strokes)
-
-  return strokes
+  return hpgl_ops_to_strokes(hpgl_lines_to_ops(lines))
 
 
 def hpgl_line_to_strokes(
@@ -162,136 +202,237 @@ def hpgl_line_to_strokes(
     [1]: New current pen position.
     [2]: New pen down state.
   """
+  return hpgl_line_ops_to_strokes(
+      hpgl_line_to_ops(line), curr_pos, down_not_up)
 
-  # A simple class that accumulates strokes from sequences of x,y arguments to
-  # HPGL pen commands.
-  class Pen:
-    strokes: Strokes
-    curr_stroke: Stroke
-    curr_pos: Point
-    down_not_up: bool
-
-    def __init__(self, curr_pos: Point, down_not_up: bool):
-      self.strokes = list()
-      self.curr_stroke = list()
-      self.curr_pos = curr_pos
-      self.down_not_up = down_not_up
-
-    def flush(self):  # Save current stroke (if nonempty) and start a new one.
-      if self.curr_stroke: self.strokes.append(self.curr_stroke)
-      self.curr_stroke = [self.curr_pos] if self.down_not_up else list()
-
-    def up_move(self, args: list[float]):
-      self.down_not_up = False
-      self.flush()
-      if args: self.curr_pos = args[-2], args[-1]
-
-    def down_move(self, args: list[float]):
-      self.down_not_up = True
-      if not self.curr_stroke: self.curr_stroke.append(self.curr_pos)
-      self.curr_stroke.extend(zip(args[::2], args[1::2]))
-      self.curr_pos = self.curr_stroke[-1]
-
-    def either_move(self, args: list[float]):
-      if self.down_not_up:
-        self.down_move(args)
-      else:
-        self.up_move(args)
-
-    def either_arc(self, args: list[float]):
-      cx, cy, dtheta = args[:3]  # Arc centre and counter-clockwise angle.
-      dtheta = dtheta * math.pi / 180.0
-
-      # Find polar offset from arc centre.
-      dx, dy = self.curr_pos[0] - cx, self.curr_pos[1] - cy
-      radius = math.sqrt(dx * dx + dy * dy)
-      theta = math.atan2(dy, dx)
-      
-      # Compute final x, y location to minimise arithmetic error.
-      fx = cx + radius * math.cos(theta + dtheta)
-      fy = cy + radius * math.sin(theta + dtheta)
-
-      # For all points in between, we go step by step in 4° increments.
-      steps = math.ceil(abs(dtheta * 180 / math.pi / 4))
-      sdtheta = dtheta / steps
-      for i in range(1, steps - 1):
-        sx = cx + radius * math.cos(theta + i * sdtheta)
-        sy = cy + radius * math.sin(theta + i * sdtheta)
-        self.either_move([sx, sy])
-
-      # Move to final x, y location.
-      self.either_move([fx, fy])
-
-  # Parse and draw.
-  pen = Pen(curr_pos, down_not_up)
+
+def hpgl_lines_to_ops(lines: Iterable[str]) -> list[HpglOps]:
+  """Parse lines of HPGL data into HPGL commands.
+
+  Parsing is the slow part of converting HPGL data to strokes, so programs
+  that draw the same HPGL data many times over can parse it just once with
+  this function and then convert the result with hpgl_ops_to_strokes.
+
+  Args:
+    lines: An iterable of lines from an HPGL file.
+
+  Returns:
+    A list with the parsed commands from each line. Commands from different
+    lines are kept apart because strokes are broken at the ends of lines.
+  """
+  return [hpgl_line_to_ops(line.strip()) for line in lines]
+
+
+def hpgl_line_to_ops(line: str) -> HpglOps:
+  """Parse one line of HPGL data into HPGL commands.
+
+  Only PU, PD, PA, PR, AA commands are kept. Other commands are discarded, as
+  are commands with arguments that aren't numbers.
+
+  Args:
+    line: A single line from an HPGL file. Can include multiple commands.
+
+  Returns:
+    A list of (opcode, arguments) tuples for the commands in the line.
+  """
+  ops: HpglOps = list()
   for statement in [s.strip() for s in line.split(';') if s.strip()]:  # I know.
-    op = statement[:2]
+    opcode = _HPGL_OPCODES.get(statement[:2])
+    if opcode is None:
+      continue  # Skip statements that we don't handle.
     try:
-      args = [float(a.strip()) for a in statement[2:].split(',') if a.strip()]
+      args = tuple(
+          float(a.strip()) for a in statement[2:].split(',') if a.strip())
     except ValueError:
       continue  # Skip statements with things that aren't numbers.
+    ops.append((opcode, args))
+  return ops
+
+
+def hpgl_ops_to_strokes(lines_ops: Iterable[HpglOps]) -> Strokes:
+  """Convert parsed lines of HPGL data to strokes.
+
+  Args:
+    lines_ops: Parsed lines of HPGL data from hpgl_lines_to_ops.
+
+  Returns:
+    A list of "strokes". A stroke is a sequnece of x,y coordinates that
+    must all be connected by straight lines.
+  """
+  strokes: Strokes = list()
+  curr_pos = (0., 0.)
+  down_not_up = False
+
+  for ops in lines_ops:
+    new_strokes, curr_pos, down_not_up = hpgl_line_ops_to_strokes(
+        ops, curr_pos, down_not_up)
+    strokes.extend(new_strokes)
+
+  return strokes
+
+
+def _arc_points(
+    cx: float, cy: float, radius: float, theta: float, sdtheta: float,
+    steps: int,
+) -> np.ndarray:
+  """Compute the intermediate points along an arc.
+
+  Args:
+    cx: x coordinate of the arc centre.
+    cy: y coordinate of the arc centre.
+    radius: Radius of the arc.
+    theta: Angle (in radians) of the arc's starting point from its centre.
+    sdtheta: Angle (in radians) between successive points on the arc.
+    steps: Number of steps in the arc; only the points at steps 1 through
+        steps - 2 are computed.
+
+  Returns:
+    A flat array of x, y coordinates for those points, alternating x and y.
+  """
+  angles = theta + np.arange(1, steps - 1) * sdtheta
+  points = np.empty((len(angles), 2))
+  np.cos(angles, out=points[:, 0])
+  np.sin(angles, out=points[:, 1])
+  points *= radius
+  points += (cx, cy)
+  return points.ravel()
+
+
+# A simple class that accumulates strokes from sequences of x,y arguments to
+# HPGL pen commands.
+class _Pen:
+  strokes: Strokes
+  curr_stroke: Stroke
+  curr_pos: Point
+  down_not_up: bool
+
+  def __init__(self, curr_pos: Point, down_not_up: bool):
+    self.strokes = list()
+    self.curr_stroke = list()
+    self.curr_pos = curr_pos
+    self.down_not_up = down_not_up
+
+  def flush(self):  # Save current stroke (if nonempty) and start a new one.
+    if self.curr_stroke: self.strokes.append(self.curr_stroke)
+    self.curr_stroke = [self.curr_pos] if self.down_not_up else list()
+
+  def up_move(self, args: Sequence[float]):
+    self.down_not_up = False
+    self.flush()
+    if args: self.curr_pos = args[-2], args[-1]
+
+  def down_move(self, args: Sequence[float]):
+    self.down_not_up = True
+    if not self.curr_stroke: self.curr_stroke.append(self.curr_pos)
+    self.curr_stroke.extend(zip(args[::2], args[1::2]))
+    self.curr_pos = self.curr_stroke[-1]
+
+  def either_move(self, args: Sequence[float]):
+    if self.down_not_up:
+      self.down_move(args)
+    else:
+      self.up_move(args)
+
+  def relative_move(self, args: Sequence[float]):
+    cx, cy = self.curr_pos
+    self.either_move([a + (cy if i & 1 else cx) for i, a in enumerate(args)])
+
+  def either_arc(self, args: Sequence[float]):
+    cx, cy, dtheta = args[:3]  # Arc centre and counter-clockwise angle.
+    dtheta = dtheta * math.pi / 180.0
+
+    # Find polar offset from arc centre.
+    dx, dy = self.curr_pos[0] - cx, self.curr_pos[1] - cy
+    radius = math.sqrt(dx * dx + dy * dy)
+    theta = math.atan2(dy, dx)
+    
+    # Compute final x, y location to minimise arithmetic error.
+    fx = cx + radius * math.cos(theta + dtheta)
+    fy = cy + radius * math.sin(theta + dtheta)
+
+    # For all points in between, we go step by step in 4° increments. All
+    # of these points and the final x, y location are visited in one move.
+    steps = math.ceil(abs(dtheta * 180 / math.pi / 4))
+    sdtheta = dtheta / steps
+    points = _arc_points(cx, cy, radius, theta, sdtheta, steps).tolist()
+    self.either_move(points + [fx, fy])
+
+
+# Pen methods that carry out each of the HPGL commands, indexed by opcode.
+_HPGL_DISPATCH: dict[int, Callable[[_Pen, Sequence[float]], None]] = {
+    HPGL_PU: _Pen.up_move,
+    HPGL_PD: _Pen.down_move,
+    HPGL_PA: _Pen.either_move,
+    HPGL_PR: _Pen.relative_move,
+    HPGL_AA: _Pen.either_arc,
+}
+
+
+def hpgl_line_ops_to_strokes(
+    ops: HpglOps, curr_pos: Point, down_not_up: bool
+) -> tuple[Strokes, Point, bool]:
+  """Convert one parsed line of HPGL data to strokes.
+
+  Args:
+    ops: Parsed HPGL commands from a single line, from hpgl_line_to_ops.
+    curr_pos: Current x,y position of the plotter pen.
+    down_not_up: Whether the pen is currently down.
+
+  Returns: a tuple with two elements
+    [0]: A list of "strokes". A stroke is a sequnece of x,y coordinates that
+        must all be connected by straight lines.
+    [1]: New current pen position.
+    [2]: New pen down state.
+  """
 
-    match op:
-      case 'PU':
-        pen.up_move(args)
-      case 'PD':
-        pen.down_move(args)
-      case 'PA':
-        pen.either_move(args)
-      case 'PR':
-        pen.either_move(
-            [sum(c) for c in zip(itertools.cycle(pen.curr_pos), args)])
-      case 'AA':
-        pen.either_arc(args)
-
-  # Done parsing. Close out any stroke underway now and quit.
+  # Draw.
+  pen = _Pen(curr_pos, down_not_up)
+  for opcode, args in ops:
+    _HPGL_DISPATCH[opcode](pen, args)
+
+  # Done drawing. Close out any stroke underway now and quit.
   pen.flush()
   return pen.strokes, pen.curr_pos, pen.down_not_up
 
 
-def transform_strokes(
-    strokes: Strokes,
-    bl: Point = (0., 0.), tr: Point = (1000., 788.),
-    # I thought the X value should be 1023, but on our 4054A, the right side
-    # of the image is getting truncated.
-    flip_horizontal: bool = False,
-    flip_vertical: bool = False,
-    rotate: float = 0.0,
-    scale: float = 1.0,
-    shift_x: float = 0.0,
-    shift_y: float = 0.0,
-) -> Strokes:
-  """Transform strokes to fill a bounding box, perhaps with other transforms.
+def _compose_affine(outer: Affine, inner: Affine) -> Affine:
+  """Compose two affine transformations: apply inner, then outer."""
+  a1, b1, c1, d1, e1, f1 = outer
+  a2, b2, c2, d2, e2, f2 = inner
+  return (a1 * a2 + b1 * d2, a1 * b2 + b1 * e2, a1 * c2 + b1 * f2 + c1,
+          d1 * a2 + e1 * d2, d1 * b2 + e1 * e2, d1 * c2 + e1 * f2 + f1)
 
-  The resulting strokes will be centred in the bounding box, with their most
-  narrowly-constrained dimension scaled to stretch across the entire box in
-  that dimension. Further transforms will then be applied as directed in the
-  order of the arguments below:
+
+@functools.lru_cache(maxsize=256)
+def _sincos(degrees: float) -> tuple[float, float]:
+  """Compute the sine and cosine of an angle given in degrees."""
+  theta = degrees * math.pi / 180
+  return math.sin(theta), math.cos(theta)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compose_transform(
+    min_x: float, min_y: float, max_x: float, max_y: float,
+    bl: Point, tr: Point,
+    flip_horizontal: bool, flip_vertical: bool,
+    rotate: float, scale: float, shift_x: float, shift_y: float,
+) -> Affine:
+  """Compose the affine transformation applied by transform_strokes.
+
+  Animations transform the same drawings in the same few ways over and over,
+  so the composed transformations are cached.
 
   Args:
-    strokes: Strokes to transform. Will not be modified.
-    bl: x,y coordinates of the bottom left-hand corner of the bounding box.
-    tr: x,y coordinates of the top right-hand corner of the bounding box.
-    flip_horizontal: Flip the drawing **along** the horizontal axis.
-    flip_vertical: Flip the drawing **along** the vertical axis.
-    scale: Scale the drawing by this factor around the screen midpoint.
-    rotate: Rotate the drawing this many degrees anticlockwise around the
-        screen midpoint.
-    shift_x: Shift the drawing left or right by this amount.
-    shift_y: Shift the drawing up or down by this amount.
+    min_x: Smallest x coordinate of any point in the strokes to transform.
+    min_y: Smallest y coordinate of any point in the strokes to transform.
+    max_x: Largest x coordinate of any point in the strokes to transform.
+    max_y: Largest y coordinate of any point in the strokes to transform.
+    bl, tr, flip_horizontal, flip_vertical, rotate, scale, shift_x, shift_y:
+        Same as the transform_strokes arguments.
 
   Returns:
-    Strokes transformed as described.
+    The composed affine transformation.
   """
-  # Find extreme stroke points
-  min_x, min_y, max_x, max_y = 2.**31, 2.**31, -2.**31, -2.**31
-  for stroke in strokes:
-    for x, y in stroke:
-      if x < min_x: min_x = x
-      if y < min_y: min_y = y
-      if x > max_x: max_x = x
-      if y > max_y: max_y = y
-
   # Determine formulas for how to scale X and Y coordinates
   screen_dx = tr[0] - bl[0]
   screen_dy = tr[1] - bl[1]
@@ -322,92 +463,120 @@ def transform_strokes(
     y_scale_factor = -y_scale_factor
     y_shift = tr[1] - y_shift
 
-  # Prepare to rotate.
-  theta = rotate * math.pi / 180
-  sin_theta, cos_theta = math.sin(theta), math.cos(theta)
+  # All of the transformations below are affine, so we compose them into a
+  # single transformation. Rotation and scaling both happen around the screen
+  # midpoint.
+  mid_x, mid_y = (tr[0] - bl[0]) / 2, (tr[1] - bl[1]) / 2
 
   # First centre the strokes in the bounding box.
-  xformed_strokes: Strokes = list()
-  for stroke in strokes:
-    xformed_strokes.append([
-        (x_scale_factor * x + x_shift, y_scale_factor * y + y_shift)
-        for x, y in stroke])
-  strokes = xformed_strokes
+  affine = (x_scale_factor, 0., x_shift, 0., y_scale_factor, y_shift)
 
   # Then apply the rotation to the strokes. Note that rotation could cause
   # some strokes to pop out of the bounding box, so you probably want to scale
   # if you're going to rotate.
-  if theta != 0.0:
-    mid_x, mid_y = (tr[0] - bl[0]) / 2, (tr[1] - bl[1]) / 2
-    rotated_strokes: Strokes = list()
-    for stroke in strokes:
-      rotated_strokes.append([
-          (cos_theta * (x - mid_x) - sin_theta * (y - mid_y) + mid_x,
-           sin_theta * (x - mid_x) + cos_theta * (y - mid_y) + mid_y)
-          for x, y in stroke])
-      strokes = rotated_strokes
+  if rotate != 0.0:
+    sin_theta, cos_theta = _sincos(rotate)
+    affine = _compose_affine((
+        cos_theta, -sin_theta, mid_x - cos_theta * mid_x + sin_theta * mid_y,
+        sin_theta, cos_theta, mid_y - sin_theta * mid_x - cos_theta * mid_y,
+    ), affine)
 
   # Now do even MORE stroke transformation, starting with scaling.
   if scale != 1.0:
-    mid_x, mid_y = (tr[0] - bl[0]) / 2, (tr[1] - bl[1]) / 2
-    scaled_strokes: Strokes = list()
-    for stroke in strokes:
-      scaled_strokes.append([
-          (scale * (x - mid_x) + mid_x, scale * (y - mid_y) + mid_y)
-          for x, y in stroke])
-    strokes = scaled_strokes
+    affine = _compose_affine((
+        scale, 0., mid_x - scale * mid_x,
+        0., scale, mid_y - scale * mid_y,
+    ), affine)
 
   # Next translations.
   if shift_x != 0.0 or shift_y != 0.0:
-    shifted_strokes: Strokes = list()
-    for stroke in strokes:
-      shifted_strokes.append([(x + shift_x, y + shift_y) for x, y in stroke])
-    strokes = shifted_strokes
+    affine = _compose_affine((1., 0., shift_x, 0., 1., shift_y), affine)
 
-  # Round to integer and return
-  rounded_strokes: Strokes = list()
-  for stroke in strokes:  # 0 argument 
-    rounded_strokes.append([(round(x, 0), round(y, 0)) for x, y in stroke])
-  return rounded_strokes
+  return affine
 
 
-def _convert_strokes(
+def transform_strokes(
     strokes: Strokes,
-    point_converter: Callable[[Point, bool], list[int]],
-) -> bytes:
-  """Convert strokes to some kind of stream of command bytes.
+    bl: Point = (0., 0.), tr: Point = (1000., 788.),
+    # I thought the X value should be 1023, but on our 4054A, the right side
+    # of the image is getting truncated.
+    flip_horizontal: bool = False,
+    flip_vertical: bool = False,
+    rotate: float = 0.0,
+    scale: float = 1.0,
+    shift_x: float = 0.0,
+    shift_y: float = 0.0,
+) -> Strokes:
+  """Transform strokes to fill a bounding box, perhaps with other transforms.
+
+  The resulting strokes will be centred in the bounding box, with their most
+  narrowly-constrained dimension scaled to stretch across the entire box in
+  that dimension. Further transforms will then be applied as directed in the
+  order of the arguments below:
 
   Args:
-    strokes: Strokes to convert to command strings. All points in all strokes
-        must be within the Tek 4010's screen area (0 < x < 1023, 0 < y < 780)
-        to avoid undefined behaviour.
-    point_converter: A function that converts points in strokes to sequences
-        of bytes (actually lists of integers in [0, 255]) that add the point
-        to the stroke. The boolean argument means that the argument point
-        starts a new stroke.
+    strokes: Strokes to transform. Will not be modified.
+    bl: x,y coordinates of the bottom left-hand corner of the bounding box.
+    tr: x,y coordinates of the top right-hand corner of the bounding box.
+    flip_horizontal: Flip the drawing **along** the horizontal axis.
+    flip_vertical: Flip the drawing **along** the vertical axis.
+    scale: Scale the drawing by this factor around the screen midpoint.
+    rotate: Rotate the drawing this many degrees anticlockwise around the
+        screen midpoint.
+    shift_x: Shift the drawing left or right by this amount.
+    shift_y: Shift the drawing up or down by this amount.
 
   Returns:
-    Some kind of stream of command bytes.
+    Strokes transformed as described, with coordinates rounded to ints.
   """
-  tekbytes: list[int] = list()
-
-  # Convert all strokes into strings and accumulate.
-  for stroke in strokes:
-    tekbytes.extend(point_converter(stroke[0], True))
-    # Draw a single dot if the stroke has only one entry in it. Otherwise,
-    # draw the full stroke.
-    if len(stroke) == 1:
-      tekbytes.extend(point_converter(stroke[0], False))
-    else:
-      for xy in stroke[1:]:
-        tekbytes.extend(point_converter(xy, False))
+  return transform_strokes_array(
+      StrokesArray.from_strokes(strokes), bl, tr, flip_horizontal,
+      flip_vertical, rotate, scale, shift_x, shift_y).to_strokes()
 
-  # Return bytes as an actual string of bytes now.
-  return bytes(tekbytes)
 
+def transform_strokes_array(
+    strokes: StrokesArray,
+    bl: Point = (0., 0.), tr: Point = (1000., 788.),
+    flip_horizontal: bool = False,
+    flip_vertical: bool = False,
+    rotate: float = 0.0,
+    scale: float = 1.0,
+    shift_x: float = 0.0,
+    shift_y: float = 0.0,
+) -> StrokesArray:
+  """Like transform_strokes, but for strokes packed into a StrokesArray.
 
-def strokes_to_tek4010(strokes: Strokes) -> bytes:
-  """Convert strokes to Tek 4010 terminal line-drawing command strings.
+  Args:
+    strokes: Strokes to transform. Will not be modified.
+    bl, tr, flip_horizontal, flip_vertical, rotate, scale, shift_x, shift_y:
+        Same as the transform_strokes arguments.
+
+  Returns:
+    Strokes transformed as described, with coordinates rounded to ints.
+  """
+  # Find extreme stroke points.
+  points = strokes.points
+  if len(points):
+    min_x, min_y = points.min(axis=0).tolist()
+    max_x, max_y = points.max(axis=0).tolist()
+  else:
+    min_x, min_y, max_x, max_y = 2.**31, 2.**31, -2.**31, -2.**31
+
+  affine = _compose_transform(
+      min_x, min_y, max_x, max_y, bl, tr, flip_horizontal, flip_vertical,
+      rotate, scale, shift_x, shift_y)
+
+  # Transform all points at once and round them to integers.
+  a, b, c, d, e, f = affine
+  points = points @ np.array([[a, d], [b, e]]) + (c, f)
+  np.rint(points, out=points)
+  return StrokesArray(points.astype(np.int64), strokes.offsets)
+
+
+def _strokes_to_point_arrays(
+    strokes: Strokes | StrokesArray,
+) -> tuple[np.ndarray, np.ndarray]:
+  """Gather stroke points into arrays for conversion to command bytes.
 
   Args:
     strokes: Strokes to convert to command strings. All points in all strokes
@@ -415,36 +584,67 @@ def strokes_to_tek4010(strokes: Strokes) -> bytes:
         to avoid undefined behaviour.
 
   Returns:
-    Tek 4010 line-drawing command strings.
+    A 2-tuple with an (N, 2) integer array of all of the points in all of the
+    strokes, rounded to ints, and an (N,) boolean array that is True for the
+    points that start a new stroke. The lone point in a single-point stroke
+    appears twice, so that it's drawn as a single dot.
   """
-  # Convert x,y coordinates to Tektronix 4010 4- or 5-byte strings (here each
-  # byte is represented with an int). The move_not_draw argument indicates
-  # whether the coordinate should continue a stroke drawn from a previous
-  # coordinate (False) or whether it should start a new stroke at the x,y
-  # location (True).
-  def xy_to_4010(xy: Point, move_not_draw: bool) -> list[int]:
-    x, y = round(xy[0]), round(xy[1])  # Round coordinates to ints.
-    x_bits = f'{x:010b}'[-10:]  # Convert coordinates to 10-bit binary.
-    y_bits = f'{y:010b}'[-10:]
-    bits_1 = f'01{y_bits[:5]}'
-    bits_2 = f'11{y_bits[5:]}'
-    bits_3 = f'01{x_bits[:5]}'
-    bits_4 = f'10{x_bits[5:]}'
-    try:
-      ints = [int(b, base=2) for b in (bits_1, bits_2, bits_3, bits_4)]
-    except ValueError as e:
-      if str(e).startswith('invalid literal'):
-        raise ValueError(
-            f'Final output screen coordinates out of bounds: {x=},{y=}; has '
-            'something been translated, scaled, or rotated so that any part '
-            'of it is positioned off screen?') from None
-      raise
-    return ([0x1d] + ints) if move_not_draw else ints
-
-  return _convert_strokes(strokes, xy_to_4010) + b'\x1f'
+  strokes = StrokesArray.from_strokes(strokes)
+  lengths = np.diff(strokes.offsets)
+
+  # Draw a single dot if the stroke has only one entry in it.
+  repeats = np.ones(len(strokes.points), dtype=np.int64)
+  repeats[strokes.offsets[:-1][lengths == 1]] = 2
+  points = np.repeat(strokes.points, repeats, axis=0)
+  lengths[lengths == 1] = 2
+
+  # Round coordinates to ints and make sure they're all on the screen.
+  points = np.rint(points).astype(np.int64)
+  if (offscreen := (points < 0).any(axis=1)).any():
+    x, y = points[offscreen.argmax()].tolist()
+    raise ValueError(
+        f'Final output screen coordinates out of bounds: {x=},{y=}; has '
+        'something been translated, scaled, or rotated so that any part '
+        'of it is positioned off screen?')
+
+  starts = np.zeros(len(points), dtype=bool)
+  starts[(np.cumsum(lengths) - lengths)[lengths > 0]] = True
+  return points, starts
+
+
+def strokes_to_tek4010(strokes: Strokes | StrokesArray) -> bytes:
+  """Convert strokes to Tek 4010 terminal line-drawing command strings.
 
+  Args:
+    strokes: Strokes to convert to command strings. All points in all strokes
+        must be within the Tek 4010's screen area (0 < x < 1023, 0 < y < 780)
+        to avoid undefined behaviour.
 
-def strokes_to_tek4050r12(strokes: Strokes) -> bytes:
+  Returns:
+    Tek 4010 line-drawing command strings.
+  """
+  points, starts = _strokes_to_point_arrays(strokes)
+  x, y = points[:, 0], points[:, 1]
+
+  # Convert x,y coordinates to Tektronix 4010 4- or 5-byte strings, all at
+  # once, directly into an output buffer of exactly the right size. Each point
+  # splits the low 10 bits of each coordinate into high and low 5-bit halves,
+  # and points that start a new stroke get a 0x1d prefix that moves to the
+  # point instead of drawing to it. A final 0x1f byte ends graphics mode.
+  tekbytes = np.empty(4 * len(points) + np.count_nonzero(starts) + 1,
+                      dtype=np.uint8)
+  offsets = 4 * np.arange(len(points)) + np.cumsum(starts)
+  tekbytes[offsets[starts] - 1] = 0x1d
+  tekbytes[offsets] = 0x20 | ((y >> 5) & 0x1f)
+  tekbytes[offsets + 1] = 0x60 | (y & 0x1f)
+  tekbytes[offsets + 2] = 0x20 | ((x >> 5) & 0x1f)
+  tekbytes[offsets + 3] = 0x40 | (x & 0x1f)
+  tekbytes[-1] = 0x1f
+
+  return tekbytes.tobytes()
+
+
+def strokes_to_tek4050r12(strokes: Strokes | StrokesArray) -> bytes:
   """Convert strokes to Tek 4050 R12 line-drawing command strings.
 
   Args:
@@ -455,54 +655,89 @@ def strokes_to_tek4050r12(strokes: Strokes) -> bytes:
   Returns:
     Tek 4050 R12 line-drawing command strings.
   """
-  # Convert x,y coordinates to 4050 R12 three-byte strings (here each byte is
-  # represented with an int). The move_not_draw argument indicates whether the
-  # coordinate should continue a stroke drawn from a previous coordinate
-  # (False) or whether it should start a new stroke at the x,y location (True).
-  def xy_to_4050r12(xy: Point, move_not_draw: bool) -> list[int]:
-    x, y = round(xy[0]), round(xy[1])  # Round coordinates to ints.
-    x_bits = f'{x:010b}'[-10:]  # Convert coordinates to 10-bit binary.
-    y_bits = f'{y:010b}'[-10:]
-    bits_1 = f'0{int(move_not_draw)}{x_bits[:3]}{y_bits[:3]}'
-    bits_2 = f'0{x_bits[3:]}'
-    bits_3 = f'0{y_bits[3:]}'
-    return [int(b, base=2) for b in (bits_1, bits_2, bits_3)]
-
-  return _convert_strokes(strokes, xy_to_4050r12)
-
-
-def strokes_to_pil_image(strokes: Strokes) -> PIL.Image:
+  points, starts = _strokes_to_point_arrays(strokes)
+  x, y = points[:, 0], points[:, 1]
+
+  # Convert x,y coordinates to 4050 R12 three-byte strings, all at once. Each
+  # point splits the low 10 bits of each coordinate into high 3-bit and low
+  # 7-bit parts, and points that start a new stroke set the 0x40 bit to move
+  # to the point instead of drawing to it.
+  r12bytes = np.empty((len(points), 3), dtype=np.uint8)
+  r12bytes[:, 0] = (np.where(starts, 0x40, 0) |
+                    ((x >> 4) & 0x38) | ((y >> 7) & 0x07))
+  r12bytes[:, 1] = x & 0x7f
+  r12bytes[:, 2] = y & 0x7f
+
+  return r12bytes.tobytes()
+
+
+@functools.lru_cache(maxsize=1)
+def _black_plane() -> PIL.Image.Image:
+  """An all-black 1024x780 'L' image for empty channels; don't draw on it."""
+  return PIL.Image.new('L', size=(1024, 780), color=0)
+
+
+def strokes_to_pil_image(
+    strokes: Strokes | StrokesArray,
+    canvas: PIL.Image.Image | None = None,
+) -> PIL.Image:
   """Convert strokes to a 1024x780 PIL image.
 
   Args:
     strokes: Strokes to convert to command strings. All points in all strokes
         must be within the Tek 4010's screen area (0 < x < 1023, 0 < y < 780)
         to avoid undefined behaviour. (Yes, 4010 area, even for the 405x.)
+    canvas: An optional 1024x780 'L' mode PIL image to clear and draw in.
+        Programs that render many images can pass the same canvas every time
+        instead of having a new one allocated for each image. Afterwards it
+        holds the G channel of the result.
 
   Returns:
     A 1024x780 RGB PIL image. Only the G channel is used, because a Tek screen
     is a green screen (and because RGB == BGR when B and R are both empty).
   """
-  image = PIL.Image.new('RGB', size=(1024, 780), color='black')
-  draw = PIL.ImageDraw.Draw(image)
-  for stroke in strokes:
-    draw.line(stroke, fill=(0, 255, 0))
-  return image.transpose(PIL.Image.FLIP_TOP_BOTTOM)
-
-
-def strokes_to_png(strokes: Strokes) -> bytes:
+  # Draw into a single-channel image, which becomes the G channel at the end.
+  if canvas is None:
+    green = PIL.Image.new('L', size=(1024, 780), color=0)
+  else:
+    green = canvas
+    green.paste(0, (0, 0) + green.size)
+  draw = PIL.ImageDraw.Draw(green)
+  # Image rows count down from the top of the screen, so we flip all y
+  # coordinates as we draw instead of flipping the image afterwards.
+  strokes = StrokesArray.from_strokes(strokes)
+  points = strokes.points * (1, -1) + (0, 779)
+  flat = points.ravel().tolist()
+  bounds = (2 * strokes.offsets).tolist()
+  for start, end in zip(bounds[:-1], bounds[1:]):
+    draw.line(flat[start:end], fill=255)
+  black = _black_plane()
+  return PIL.Image.merge('RGB', (black, green, black))
+
+
+def strokes_to_png(
+    strokes: Strokes | StrokesArray,
+    compress_level: int = 1,
+    canvas: PIL.Image.Image | None = None,
+) -> bytes:
   """Convert strokes to 1024x780 PNG file data.
 
   Args:
     strokes: Strokes to convert to command strings. All points in all strokes
         must be within the Tek 4010's screen area (0 < x < 1023, 0 < y < 780)
         to avoid undefined behaviour. (Yes, 4010 area, even for the 405x.)
+    compress_level: zlib compression level for the PNG data, from 0 (none) to
+        9 (smallest but slowest). Mostly-black line drawings compress well
+        even at the fastest level, 1.
+    canvas: An optional 1024x780 'L' mode PIL image to clear and draw in; see
+        `strokes_to_pil_image`.
 
   Returns:
     Binary PNG file data.
   """
   pngdata = io.BytesIO()
-  strokes_to_pil_image(strokes).save(pngdata, 'PNG', optimize=True)
+  strokes_to_pil_image(strokes, canvas).save(
+      pngdata, 'PNG', compress_level=compress_level)
   return pngdata.getvalue()
 
 
@@ -520,12 +755,20 @@ def tek4050r12_to_tape_records(tektext: bytes) -> bytes:
   Returns:
     Contents of a McGraw device tape records data file.
   """
-  records = [tektext[p:(p+8175)] for p in range(0, len(tektext), 8175)]
-  for i in range(1, len(records)):
-    last = records[i - 1]
-    records[i] = bytes([last[-3] | 0x40, last[-2], last[-1]]) + records[i]
-  header = lambda r: bytes([0x40 | (len(r) >> 8), len(r) & 0xff])
-  return b''.join(header(r) + r + b'\0' for r in records) + b'\x40\x01Xh'
+  records = bytearray()
+  tekdata = memoryview(tektext)
+  for p in range(0, len(tektext), 8175):
+    chunk = tekdata[p:(p+8175)]
+    # Records after the first start by moving to the last point of the record
+    # before.
+    stitch = tekdata[(p-3):p] if p else b''
+    size = len(stitch) + len(chunk)
+    records += bytes([0x40 | (size >> 8), size & 0xff])
+    if stitch: records += bytes([stitch[0] | 0x40, stitch[1], stitch[2]])
+    records += chunk
+    records.append(0)
+  records += b'\x40\x01Xh'
+  return bytes(records)
 
 
 def tek4050r12_to_tek4050r12zip(tektext: bytes, file_number: int) -> bytes:
@@ -558,6 +801,14 @@ def tek4050r12_to_tek4050r12zip(tektext: bytes, file_number: int) -> bytes:
   return zipdata.getvalue()
 
 
+# For parsing transformation commands in parse_transforms: commands are either
+# flips or a one-letter command followed by a number.
+_TRANSFORM_COMMAND_RE = re.compile(r'(fh|fv)|([srxy])(.*)')
+_TRANSFORM_FLIP_KWARGS = {'fh': 'flip_horizontal', 'fv': 'flip_vertical'}
+_TRANSFORM_VALUE_KWARGS = {
+    's': 'scale', 'r': 'rotate', 'x': 'shift_x', 'y': 'shift_y'}
+
+
 def get_all_strokes(
     files: Sequence[TextIO],
     transforms: str,
@@ -567,6 +818,58 @@ def get_all_strokes(
 
   Args:
     files: Open file handles for each of the HPGL input drawings.
+    transforms: Transform specifications for the input drawings; see
+        get_all_strokes_from_ops.
+    extra_lines: Extra lines to draw as individual strokes; see
+        get_all_strokes_from_ops.
+
+  Returns:
+    Combined strokes for all of the inputs provided.
+  """
+  return get_all_strokes_from_ops(
+      [hpgl_lines_to_ops(file.read().splitlines()) for file in files],
+      transforms, extra_lines)
+
+
+def get_all_strokes_from_ops(
+    drawings: Sequence[list[HpglOps]],
+    transforms: str,
+    extra_lines: str = '',
+) -> Strokes:
+  """Collect (and maybe transform) all strokes from parsed HPGL drawings.
+
+  Args:
+    drawings: Parsed HPGL data for each of the input drawings, from
+        hpgl_lines_to_ops.
+    transforms: Transform specifications for the input drawings; see
+        parse_transforms.
+    extra_lines: Extra lines to draw as individual strokes; see
+        parse_extra_lines.
+
+  Returns:
+    Combined strokes for all of the inputs provided.
+  """
+  # Collect and transform strokes from all input drawings.
+  all_strokes: Strokes = []
+  ts_kwargses = parse_transforms(transforms, len(drawings))
+  for lines_ops, ts_kwargs in zip(drawings, ts_kwargses):
+    strokes = hpgl_ops_to_strokes(lines_ops)
+    strokes = transform_strokes(strokes, **ts_kwargs)  # type: ignore
+    all_strokes.extend(strokes)
+
+  # Add extra lines.
+  all_strokes.extend(parse_extra_lines(extra_lines))
+
+  return all_strokes
+
+
+def parse_transforms(
+    transforms: str,
+    num_drawings: int,
+) -> list[TransformKwargs]:
+  """Parse transform specifications for input drawings.
+
+  Args:
     transforms: Transform specifications for the input drawings. By default,
         drawings are scaled to fill the entire screen. This string of
         transformation commands, separated by ! characters, changes this.
@@ -575,22 +878,18 @@ def get_all_strokes(
         horizontally by -2.4, y7=displace vertically by 7. Prefix command
         strings by 0: to apply to the 0th HPGL file only; prefix by nothing to
         apply to all files. Separate multiple command strings with , (comma).
-    extra_lines: Extra lines to draw as individual strokes. Lines are coded as
-        !-separated four-point tuples: x1!y1!x2!y2, with multiple lines
-        separated by , (comma). Example: 100!150!200!250,400!450!500!550. Lines
-        are not subject to the transformation commands in transforms.
+    num_drawings: Number of input drawings.
 
   Returns:
-    Combined strokes for all of the inputs provided.
+    Keyword arguments for transform_strokes for each of the input drawings.
   """
   # Parse transforms into a mapping from indices into files to kwargs for
   # transform_strokes. These are kept in this dict.
-  Kwargs = dict[str, bool | float]
-  ts_kwargses: dict[int, Kwargs] = {}
+  ts_kwargses: dict[int, TransformKwargs] = {}
 
   # It's also possible to specify "global" kwargs: kwargs that apply to all
   # of the input files. Those go in here:
-  common_kwargs: Kwargs = {}
+  common_kwargs: TransformKwargs = {}
 
   try:
     for transform in (t.strip() for t in transforms.split(',')):
@@ -607,37 +906,37 @@ def get_all_strokes(
       for command in (c.strip() for c in commands.split('!')):
         if not command:
           continue
-        elif command == 'fh':
-          ts_kwargs['flip_horizontal'] = True
-        elif command == 'fv':
-          ts_kwargs['flip_vertical'] = True
-        elif command.startswith('s'):
-          ts_kwargs['scale'] = float(command[1:])
-        elif command.startswith('r'):
-          ts_kwargs['rotate'] = float(command[1:])
-        elif command.startswith('x'):
-          ts_kwargs['shift_x'] = float(command[1:])
-        elif command.startswith('y'):
-          ts_kwargs['shift_y'] = float(command[1:])
+        elif m := _TRANSFORM_COMMAND_RE.fullmatch(command):
+          flip, name, value = m.groups()
+          if flip:
+            ts_kwargs[_TRANSFORM_FLIP_KWARGS[flip]] = True
+          else:
+            ts_kwargs[_TRANSFORM_VALUE_KWARGS[name]] = float(value)
         else:
           raise RuntimeError(f'Unrecognised transformation command "{command}"')
   except ValueError as e:
     raise RuntimeError(f'Error parsing transformations: {e}')
 
-  # Collect and transform strokes from all input files.
-  all_strokes: Strokes = []
-  for i, file in enumerate(files):
-    ts_kwargs = ts_kwargses.get(i, common_kwargs)
-    strokes = hpgl_lines_to_strokes(file.read().splitlines())
-    strokes = transform_strokes(strokes, **ts_kwargs)  # type: ignore
-    all_strokes.extend(strokes)
+  return [ts_kwargses.get(i, common_kwargs) for i in range(num_drawings)]
 
-  # Add extra lines.
+
+def parse_extra_lines(extra_lines: str) -> Strokes:
+  """Parse extra lines to draw as individual strokes.
+
+  Args:
+    extra_lines: Extra lines to draw as individual strokes. Lines are coded as
+        !-separated four-point tuples: x1!y1!x2!y2, with multiple lines
+        separated by , (comma). Example: 100!150!200!250,400!450!500!550. Lines
+        are not subject to the transformation commands in transforms.
+
+  Returns:
+    A two-point stroke for each of the lines.
+  """
+  strokes: Strokes = []
   for line in (l.strip() for l in extra_lines.strip().split(',') if l):
     x1, y1, x2, y2 = (float(f) for f in line.split('!'))
-    all_strokes.append([(x1, y1), (x2, y2)])
-
-  return all_strokes
+    strokes.append([(x1, y1), (x2, y2)])
+  return strokes
 
 
 def main(FLAGS: argparse.Namespace):
@@ -651,6 +950,7 @@ def main(FLAGS: argparse.Namespace):
         'The --file_number argument is required for --device=tek4050r12zip')
     tektext = tek4050r12_to_tek4050r12zip(tektext, FLAGS.file_number)
   FLAGS.output.buffer.write(tektext)
+  FLAGS.output.flush()  # Don't count on this happening at interpreter exit.
 
 
 if __name__ == '__main__':
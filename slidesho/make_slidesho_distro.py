@@ -32,7 +32,9 @@ Dependencies
 ------------
 
 Python 3.10 or so is probably this program's only real dependency; 3.11
-definitely works.
+definitely works. If the optional `deflate` package (Python bindings for the
+libdeflate library) is installed, this program uses it to compress archive
+contents faster than the standard `zlib` module can.
 
 Revision history
 ----------------
@@ -45,21 +47,30 @@ project at <http://github.com/stepleton/hpgl2tek>.
 """
 
 import argparse
+import collections
+import concurrent.futures
 import dataclasses
+import os
 import random
 import sys
 import zipfile
+import zlib
 
 from collections.abc import Sequence, MutableSequence
 from typing import TextIO
 
+try:
+  import deflate
+except ImportError:
+  deflate = None  # type: ignore
+
 
 @dataclasses.dataclass
 class ArchiveItem:
   """Slideshow archive item."""
   filename: str
   description: str
-  data: bytes
+  size: int
 
 
 def _define_flags() -> argparse.ArgumentParser:
@@ -80,6 +91,12 @@ def _define_flags() -> argparse.ArgumentParser:
                            'Leave blank to write to standard output.'),
                      type=argparse.FileType('wb'), default=sys.stdout.buffer)
 
+  flags.add_argument('-c', '--compress-level',
+                     help=('DEFLATE compression level for archive contents, '
+                           'from 0 (no compression) to 9 (smallest archive, '
+                           'slowest to make).'),
+                     type=int, choices=range(10), default=6, metavar='LEVEL')
+
   flags.add_argument('-s', '--shuffle',
                      help=('Shuffle the ordering of items in the catalog file '
                            'when producing the slideshow archive catalog.'),
@@ -88,42 +105,136 @@ def _define_flags() -> argparse.ArgumentParser:
   return flags
 
 
+def _parse_catalog_line(line: str) -> tuple[str, str] | None:
+  """Get a filename and description from a catalog line; None if no item."""
+  line = line.strip()
+  if not line or line.startswith('#'):  # Skip blank lines, comments.
+    return None
+  # Only the first and last tab-separated fields matter.
+  filename, tab, rest = line.partition('\t')
+  if not tab: raise ValueError(f'No description for {filename} in catalog')
+  return filename, rest.rpartition('\t')[2]
+
+
 def load_all_items(catalog_io: TextIO) -> MutableSequence[ArchiveItem]:
-  """Load archive items listed in the catalog."""
-  items: list[ArchiveItem] = []
-  for line in catalog_io:
-    line = line.strip()
-    if not line or line.startswith('#'):  # Skip blank lines, comments.
-      continue
-    filename, *_, description = line.split('\t')
-    with open(filename, 'rb') as f:
-      data = f.read()
-    items.append(ArchiveItem(filename, description, data))
-  return items
+  """Load archive items listed in the catalog (but not their contents)."""
+  entries = [entry for line in catalog_io
+             if (entry := _parse_catalog_line(line)) is not None]
+
+  # Look up file sizes in parallel to hide latency on slow or remote storage.
+  with concurrent.futures.ThreadPoolExecutor(os.cpu_count() or 1) as executor:
+    sizes = executor.map(os.path.getsize, [f for f, _ in entries])
+    return [ArchiveItem(filename, description, size)
+            for (filename, description), size in zip(entries, sizes)]
 
 
 def make_archive_catalog(items: Sequence[ArchiveItem]) -> bytes:
   """Create the data that goes into the catalog archive file."""
-  lines: list[str] = []
+  catalog = bytearray()
   for i, item in enumerate(items):
-    lines.append(f'{i:08d}.TEK')
-    lines.append(f'{len(item.data)}')
-    lines.append(item.description)
-  lines.extend(['__END__'] * 3)  # Terminator marker
-  lines.append('\r')
-  return '\r'.join(lines).encode()
+    catalog += f'{i:08d}.TEK\r{item.size}\r{item.description}\r'.encode()
+  catalog += b'__END__\r__END__\r__END__\r\r'  # Terminator marker
+  return bytes(catalog)
+
+
+def _deflate(data: bytes, compresslevel: int) -> tuple[int, bytes]:
+  """Compress data for a ZIP archive member; return its CRC and the result."""
+  if deflate is not None:
+    return deflate.crc32(data), deflate.deflate_compress(data, compresslevel)
+  compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+  return zlib.crc32(data), compressor.compress(data) + compressor.flush()
+
+
+def _deflate_item(
+    item: ArchiveItem,
+    compresslevel: int,
+) -> tuple[int, int, bytes]:
+  """Load and compress an item's file; return its size, its CRC, and the result.
+
+  Raises:
+    RuntimeError: the file's size isn't the size recorded in `item`, which is
+        the size the archive catalog gives for it.
+  """
+  with open(item.filename, 'rb') as f:
+    data = f.read()
+  if len(data) != item.size: raise RuntimeError(
+      f'{item.filename} is {len(data)} bytes long now, but the catalog says '
+      f'it is {item.size} bytes long; did it change?')
+  return len(data), *_deflate(data, compresslevel)
+
+
+# Timestamp for all archive members. A fixed time makes archives reproducible.
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def _write_deflated(
+    zf: zipfile.ZipFile,
+    arcname: str,
+    file_size: int,
+    crc: int,
+    compressed: bytes,
+):
+  """Add a member to a ZIP archive given its already-compressed contents.
+
+  The zipfile module can only write members by compressing them itself, so
+  this function does the same bookkeeping as `ZipFile.writestr` instead. It's
+  the only place in this program that uses ZipFile internals.
+
+  Args:
+    zf: ZIP archive open for writing.
+    arcname: Name of the new archive member.
+    file_size: Uncompressed size of the new archive member.
+    crc: CRC-32 of the uncompressed archive member.
+    compressed: The archive member compressed with raw DEFLATE.
+  """
+  zinfo = zipfile.ZipInfo(arcname, date_time=_ZIP_DATE_TIME)
+  zinfo.compress_type = zipfile.ZIP_DEFLATED
+  zinfo.external_attr = 0o600 << 16  # ?rw-------
+  zinfo.file_size = file_size
+  zinfo.compress_size = len(compressed)
+  zinfo.CRC = crc
+
+  fp = zf.fp
+  assert fp is not None  # mypy
+  if zf._seekable:  # type: ignore[attr-defined]
+    fp.seek(zf.start_dir)
+  zinfo.header_offset = fp.tell()
+  zf._writecheck(zinfo)  # type: ignore[attr-defined]
+  zf._didModify = True  # type: ignore[attr-defined]
+  fp.write(zinfo.FileHeader())
+  fp.write(compressed)
+  zf.start_dir = fp.tell()
+  zf.filelist.append(zinfo)
+  zf.NameToInfo[zinfo.filename] = zinfo
 
 
 def main(FLAGS: argparse.Namespace):
   # Load items, make catalog.
   items = load_all_items(FLAGS.catalog_file)
   if FLAGS.shuffle: random.shuffle(items)
-  # Create output archive.
-  with zipfile.ZipFile(
-      FLAGS.output, 'a', zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
-    zf.writestr('CATALOG.DAT', make_archive_catalog(items))
+  catalog = make_archive_catalog(items)
+
+  # Create output archive. Compression is the slow part, so items are loaded
+  # and compressed in parallel (zlib releases the GIL while it works), then
+  # written to the archive in order. Only a few items are underway at once, so
+  # only those need to be in memory.
+  max_workers = os.cpu_count() or 1
+  with (zipfile.ZipFile(FLAGS.output, 'a') as zf,
+        concurrent.futures.ThreadPoolExecutor(max_workers) as executor):
+    _write_deflated(zf, 'CATALOG.DAT', len(catalog),
+                    *_deflate(catalog, FLAGS.compress_level))
+
+    underway: collections.deque[
+        tuple[str, concurrent.futures.Future[tuple[int, int, bytes]]]] = (
+            collections.deque())
     for i, item in enumerate(items):
-      zf.writestr(f'{i:08d}.TEK', item.data)
+      underway.append((f'{i:08d}.TEK', executor.submit(
+          _deflate_item, item, FLAGS.compress_level)))
+      if len(underway) > 2 * max_workers:
+        arcname, future = underway.popleft()
+        _write_deflated(zf, arcname, *future.result())
+    for arcname, future in underway:
+      _write_deflated(zf, arcname, *future.result())
 
 
 if __name__ == '__main__':
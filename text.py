@@ -46,6 +46,8 @@ project at <http://github.com/stepleton/hpgl2tek>.
 """
 
 import argparse
+import functools
+import io
 import sys
 
 import HersheyFonts
@@ -75,36 +77,55 @@ def _define_flags() -> argparse.ArgumentParser:
   return flags
 
 
+@functools.lru_cache(maxsize=None)
+def _get_font(font: str) -> HersheyFonts.HersheyFonts:
+  """Load a Hershey font, caching it for later calls to render.
+
+  The cached HersheyFonts object is shared by every caller that uses the same
+  font, so callers must not change its rendering options. `strokes_for_text`
+  only reads the object, so it's safe to call from several threads at once.
+
+  Args:
+    font: Name of a Hershey font; one of FONT_NAMES.
+
+  Returns:
+    A HersheyFonts object with the font loaded.
+  """
+  hf = HersheyFonts.HersheyFonts()
+  hf.load_default_font(font)
+  return hf
+
+
 def render(text: str, font: str) -> str:
   """Render a text string in HPGL in the specified Hershey font."""
   if font not in FONT_NAMES: raise ValueError(
       f'{font} is not a valid Hershey font name. Valid Hershey font names are '
       f'{",".join(FONT_NAMES)}.')
 
-  # Create and configure the HersheyFont object.
-  hf = HersheyFonts.HersheyFonts()
-  hf.load_default_font(font)
+  # Retrieve the HersheyFont object for this font.
+  hf = _get_font(font)
 
-  # Render the text into strokes: sequences of vertices. Convert generators
-  # into full lists --- we're not rendering War and Peace, we've got the RAM.
+  # Render the text into strokes: sequences of vertices. Each stroke is
+  # consumed just once, so there's no need to collect them into lists.
   strokes_gen = hf.strokes_for_text(text)
-  strokes = [list(s) for s in strokes_gen]
 
   # Convert the strokes to HPGL. Note -y: the hershey fonts have the Y axis
   # pointing downward.
-  hpgl = ['IN;']
-  for stroke in (s for s in strokes if s):  # Skip empty strokes.
-    x, y = stroke[0]
-    hpgl.append(f'PU{x},{-y};')
-
-    if len(stroke) == 1:           # Make a dot for one-point-only strokes.
-      hpgl.append(f'PD{x},{-y};')  # Not sure this ever happens.
-    else:
-      hpgl.append('PD' + ','.join(f'{x},{-y}' for x, y in stroke[1:]) + ';')
+  hpgl = io.StringIO()
+  hpgl.write('IN;\n')
+  for stroke in strokes_gen:
+    vertices = iter(stroke)
+    if (first := next(vertices, None)) is None: continue  # Skip empty strokes.
+    x, y = first
+
+    # Format the whole stroke at once. For one-point-only strokes, the pen
+    # goes down at the first point to make a dot. Not sure this ever happens.
+    rest = ','.join([f'{x},{-y}' for x, y in vertices]) or f'{x},{-y}'
+    hpgl.write(f'PU{x},{-y};\nPD{rest};\n')
 
   # Conclude the HPGL and return.
-  hpgl.append('IN;\n')
-  return '\n'.join(hpgl)
+  hpgl.write('IN;\n')
+  return hpgl.getvalue()
 
 
 def main(FLAGS: argparse.Namespace):
@@ -31,13 +31,16 @@ project at <http://github.com/stepleton/hpgl2tek>.
 """
 
 import argparse
-import itertools
+import concurrent.futures
+import functools
+import os
 import pathlib
 import string
 import re
+import struct
 import zipfile
 
-from typing import Generator
+from typing import Iterable
 
 
 def _define_flags() -> argparse.ArgumentParser:
@@ -57,6 +60,16 @@ def _define_flags() -> argparse.ArgumentParser:
   return flags
 
 
+# Regular expressions for parsing Flash Drive filenames and for finding and
+# changing the first and final frame file numbers in animation player programs.
+_FLASH_DRIVE_FILENAME_RE = re.compile(r'(\d+)\s+([A-Z]+)\s+(.*?)\s+(\d+)')
+_PLAYER_FIRST_FRAME_RE = re.compile(rb'(\d+) LET F=(\d+)')
+_PLAYER_FINAL_FRAME_RE = re.compile(rb'(\d+) IF F>(\d+) THE')
+_PLAYER_BOUNDS_RE = re.compile(
+    rb'\d+ LET F=(?P<first>\d+)|\d+ IF F>(?P<final>\d+) THE')
+
+
+@functools.lru_cache(maxsize=None)
 def parse_flash_drive_filename(filename: str) -> tuple[int, str, str, int]:
   """Parse the Flash Drive's inconvenient file naming scheme.
 
@@ -94,9 +107,20 @@ def parse_flash_drive_filename(filename: str) -> tuple[int, str, str, int]:
 
   Raises: ValueError if the filename doesn't adhere to this... format.
   """
+  # Most filenames are aligned exactly as described above, so try slicing the
+  # fields out of their usual positions first.
+  number, type_, name = (f.rstrip() for f in (
+      filename[:7], filename[7:15], filename[15:36]))
+  size = filename[37:]
+  if (len(number) < 7 and number.isdecimal() and
+      len(type_) < 8 and type_.isascii() and type_.isalpha() and
+      type_.isupper() and not name[:1].isspace() and
+      filename[36:37] == ' ' and size.isdecimal()):
+    return int(number), type_, name, int(size)
+
   # This regex requires backtracking but we do it to give the filename a bit
   # of slack w.r.t. byte alignment. Even Monty gets that wrong sometimes.
-  if (m := re.fullmatch(r'(\d+)\s+([A-Z]+)\s+(.*?)\s+(\d+)', filename)) is None:
+  if (m := _FLASH_DRIVE_FILENAME_RE.fullmatch(filename)) is None:
     raise ValueError(f'Filename {filename} has sensibly abstained from '
                      'adhering to the Flash Drive filename format.')
   return int(m.group(1)), m.group(2), m.group(3), int(m.group(4))
@@ -166,13 +190,21 @@ def get_player_program_bounds(player: bytes) -> tuple[int, int]:
 
   Raises: ValueError if it can't find both file numbers.
   """
-  if (m := re.search(rb'\d+ LET F=(\d+)', player)) is None: raise ValueError(
+  # Find the first occurrence of each number in one pass over the program.
+  first: bytes | None = None
+  final: bytes | None = None
+  for m in _PLAYER_BOUNDS_RE.finditer(player):
+    if first is None: first = m.group('first')
+    if final is None: final = m.group('final')
+    if first is not None and final is not None: break
+
+  if first is None: raise ValueError(
       "Failed to find the first frame's file number in the player program")
-  first_frame = int(m.group(1)) + 1  # see logic of the player program.
+  first_frame = int(first) + 1  # see logic of the player program.
 
-  if (m := re.search(rb'\d+ IF F>(\d+) THE', player)) is None: raise ValueError(
+  if final is None: raise ValueError(
       "Failed to find the final frame's file number in the player program")
-  final_frame = int(m.group(1))
+  final_frame = int(final)
 
   return first_frame, final_frame
 
@@ -200,25 +232,111 @@ def set_player_program_bounds(
   Raises: ValueError if it can't successfully modify the BASIC file.
   """
   replacement = bytes(rf'\1 LET F={first_frame-1}', 'UTF-8')
-  player, subs = re.subn(rb'(\d+) LET F=\d+', replacement, player)
+  player, subs = _PLAYER_FIRST_FRAME_RE.subn(replacement, player)
   if subs != 1: raise ValueError(
       "Failed to alter the first frame's file number in the player program")
 
   replacement = bytes(rf'\1 IF F>{final_frame} THE', 'UTF-8')
-  player, subs = re.subn(rb'(\d+) IF F>\d+ THE', replacement, player)
+  player, subs = _PLAYER_FINAL_FRAME_RE.subn(replacement, player)
   if subs != 1: raise ValueError(
       "Failed to alter the final frame's file number in the player program")
 
   return player
 
 
-def make_chunk(zf_in: zipfile.ZipFile,
+# Size of the buffer used for copying ZIP file members in _copy_member.
+_COPY_BUFFER_SIZE = 65536
+
+
+def _copy_member(zf_in: zipfile.ZipFile, info: zipfile.ZipInfo,
+                 zf_out: zipfile.ZipFile, new_name: str):
+  """Copy a member from one ZIP file to another without recompressing it.
+
+  The zipfile module has no public way to read or write a member's compressed
+  bytes, so this function does the same bookkeeping as `ZipFile.writestr`
+  itself. It's the only place in this program that uses ZipFile internals.
+  Encrypted members can't be copied this way (their local headers need the
+  encryption details); they are decompressed and written out again instead,
+  which raises an error unless zf_in has the right password set.
+
+  Args:
+    zf_in: ZIP file open for reading.
+    info: Information about the member of zf_in to copy.
+    zf_out: ZIP file open for writing.
+    new_name: Name for the copied member in zf_out.
+  """
+  zinfo = zipfile.ZipInfo(new_name, date_time=info.date_time)
+  zinfo.compress_type = info.compress_type
+  zinfo.external_attr = 0o600 << 16  # ?rw-------
+
+  if info.flag_bits & 0x1:  # Encrypted member.
+    zf_out.writestr(zinfo, zf_in.read(info))
+    return
+
+  zinfo.file_size = info.file_size
+  zinfo.compress_size = info.compress_size
+  zinfo.CRC = info.CRC
+
+  fp_in, fp_out = zf_in.fp, zf_out.fp
+  assert fp_in is not None and fp_out is not None  # mypy
+  with zf_in._lock:  # type: ignore[attr-defined]
+    # Find the member's compressed data after its local file header, which
+    # has a fixed-size part followed by a filename and an "extra" field.
+    fp_in.seek(info.header_offset)
+    header = fp_in.read(30)
+    if header[:4] != b'PK\x03\x04': raise zipfile.BadZipFile(
+        f'Bad local file header for {info.filename} in {zf_in.filename}')
+    name_size, extra_size = struct.unpack('<HH', header[26:30])
+    fp_in.seek(name_size + extra_size, 1)
+
+    # Write the new member's local file header, then copy the data through a
+    # fixed-size buffer.
+    if zf_out._seekable:  # type: ignore[attr-defined]
+      fp_out.seek(zf_out.start_dir)
+    zinfo.header_offset = fp_out.tell()
+    zf_out._writecheck(zinfo)  # type: ignore[attr-defined]
+    zf_out._didModify = True  # type: ignore[attr-defined]
+    fp_out.write(zinfo.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+      if not (data := fp_in.read(min(remaining, _COPY_BUFFER_SIZE))):
+        raise zipfile.BadZipFile(
+            f'Truncated data for {info.filename} in {zf_in.filename}')
+      fp_out.write(data)
+      remaining -= len(data)
+
+  zf_out.start_dir = fp_out.tell()
+  zf_out.filelist.append(zinfo)
+  zf_out.NameToInfo[zinfo.filename] = zinfo
+
+
+def index_by_file_number(names: Iterable[str]) -> dict[int, list[str]]:
+  """Index Flash Drive filenames by their file numbers.
+
+  Args:
+    names: Flash Drive filenames, e.g. the names of files in a ZIP file.
+
+  Returns: a dict mapping each file number to a list of all of the filenames
+      with that number. There should only be one, but see the warning in the
+      docstring for parse_flash_drive_filename.
+  """
+  by_number: dict[int, list[str]] = {}
+  for n in names:
+    by_number.setdefault(parse_flash_drive_filename(n)[0], []).append(n)
+  return by_number
+
+
+def make_chunk(zf_in: zipfile.ZipFile, by_number: dict[int, list[str]],
                player: bytes, first_frame: int, final_frame: int,
                zf_out: zipfile.ZipFile):
   """Excerpt an animation ZIP file into a smaller ZIP file.
 
   Args:
     zf_in: Input animation ZIP file.
+    by_number: Filenames in zf_in indexed by file number, as returned by
+        index_by_file_number. Only needs entries for first_frame through
+        final_frame; the caller has already scanned zf_in's contents.
     player: Contents of the animation player ZIP file from zf_in. You could
         load it from zf_in if you wanted, but the caller will have loaded it
         already, so why do it again.
@@ -232,27 +350,58 @@ def make_chunk(zf_in: zipfile.ZipFile,
                       1, 'ASCII', 'PROG Animation Player', len(player)),
                   player)
 
-  # Retrieve filenames from the input ZIP file.
-  in_contents = zf_in.namelist()
-
   # Copy animation frame files (renumbered) into the output zip file.
   for f in range(first_frame, final_frame + 1):
     # Get filename of the f'th frame.
-    frames = [n for n in in_contents if n.startswith(f'{f} ')]
+    frames = by_number.get(f, [])
     if len(frames) != 1: raise ValueError(
         f'Failed to find frame {f} in the animation ZIP file')
     _, type_, name, size = parse_flash_drive_filename(frames[0])
 
     # Compute output filename for this frame, then copy the frame data.
     new_n = build_flash_drive_filename(f-first_frame+2, type_, name, size)
-    zf_out.writestr(new_n, zf_in.read(frames[0]))
+    _copy_member(zf_in, zf_in.getinfo(frames[0]), zf_out, new_n)
+
+
+def _suffix(index: int) -> str:
+  """Returns the index'th item of a, b, ..., z, aa, ... az, ba, ......, zz, aaa.
+
+  Args:
+    index: Index of the suffix to return, counting from 0 for 'a'.
+
+  Returns:
+    The suffix with '.zip' appended to it.
+  """
+  chars = ''
+  index += 1
+  while index:  # Bijective base-26 conversion.
+    index, digit = divmod(index - 1, 26)
+    chars = string.ascii_lowercase[digit] + chars
+  return chars + '.zip'
 
 
-def _suffix_sequence() -> Generator[str, None, None]:
-  """Yields the sequence a, b, ..., z, aa, ... az, ba, ......, zz, aaa, ..."""
-  for c in itertools.count(start=1):
-    for chars in itertools.product(*(c * [string.ascii_lowercase])):
-      yield ''.join(chars) + '.zip'
+def _produce_chunk(
+    input_path: str,
+    by_number: dict[int, list[str]],
+    player: bytes,
+    first_frame: int,
+    final_frame: int,
+    output_path: str,
+):
+  """Make one chunk ZIP file; a wrapper around make_chunk for worker processes.
+
+  Args:
+    input_path: Path to the input animation ZIP file.
+    by_number: Filenames in the input ZIP file indexed by file number; see
+        make_chunk.
+    player: Text of the BASIC player program from the input ZIP file.
+    first_frame: File number of the first frame to include in the chunk.
+    final_frame: File number of the final frame to include in the chunk.
+    output_path: Path to the chunk ZIP file to create. Must not exist.
+  """
+  with zipfile.ZipFile(input_path, mode='r') as zf_in:
+    with zipfile.ZipFile(output_path, mode='x') as zf_out:
+      make_chunk(zf_in, by_number, player, first_frame, final_frame, zf_out)
 
 
 def main(FLAGS: argparse.Namespace):
@@ -268,16 +417,28 @@ def main(FLAGS: argparse.Namespace):
     player, _ = get_player_program(zf_in)
     first_frame, final_frame = get_player_program_bounds(player)
 
-    # The zipfiles we'll create as outputs will have this sequence of endings.
-    suffixes = _suffix_sequence()
+    # Index the input ZIP file's contents by file number, once for all chunks.
+    by_number = index_by_file_number(zf_in.namelist())
 
-    # Portion out ZIP file into new, smaller ZIP files.
-    for chunk_first_frame in range(first_frame, final_frame+1, 225):
+  # Portion out ZIP file into new, smaller ZIP files. The chunks are
+  # independent of each other, so worker processes can make them in parallel.
+  with concurrent.futures.ProcessPoolExecutor(
+      max_workers=os.cpu_count()) as executor:
+    futures = []
+    for chunk_index, chunk_first_frame in enumerate(
+        range(first_frame, final_frame+1, 225)):
       chunk_final_frame = min(final_frame, chunk_first_frame + 225 - 1)
 
-      output_zip_filename = f'{output_prefix}{next(suffixes)}'
-      with zipfile.ZipFile(output_zip_filename, mode='x') as zf_out:
-        make_chunk(zf_in, player, chunk_first_frame, chunk_final_frame, zf_out)
+      output_zip_filename = f'{output_prefix}{_suffix(chunk_index)}'
+      chunk_by_number = {f: by_number[f] for f in
+                         range(chunk_first_frame, chunk_final_frame + 1)
+                         if f in by_number}
+      futures.append(executor.submit(
+          _produce_chunk, FLAGS.animation_file, chunk_by_number, player,
+          chunk_first_frame, chunk_final_frame, output_zip_filename))
+
+    # Wait for all chunks, raising any exception a worker encountered.
+    for future in futures: future.result()
 
 
 if __name__ == '__main__':